@@ -11,7 +11,45 @@ class Settings(BaseSettings):
     password: str = ""
     token: str = ""
     auth_mode: str = "auto"  # basic|token|auto
+    log_level: str = "INFO"
+    http2: bool = False  # needs the optional `h2` package (pip install .[http2])
+    max_connections: int = 20
+    max_keepalive_connections: int = 10
+    keepalive_expiry: float = 30.0
+    connect_timeout: float = 10.0
+    read_timeout: float = 60.0
+    pool_timeout: float = 30.0
+    retries: int = 3  # retries of idempotent requests on 502/503/504 and connection errors
+    retry_backoff: float = 0.5  # base delay (seconds) for jittered exponential backoff
+    retry_backoff_max: float = 10.0
+    adaptive_limit: bool = True  # adapt in-flight requests to Szurubooru latency/errors
+    limit_initial: int = 4  # starting (or, with adaptive_limit off, fixed) concurrent requests
+    limit_min: int = 1
+    limit_max: int = 32
+    limit_latency_tolerance: float = 2.0  # back off once a route's p95 exceeds this multiple of its baseline
     download_dir: Path = Path("/tmp/szuru-downloads")
+    work_dir_ttl: float = 24 * 3600  # seconds before a finished job's download directory is removed
+    work_dir_cleanup_interval: float = 3600  # seconds between cleanup sweeps
+    state_dir: Path = Path("/tmp/szuru-state")  # local databases and run state
+    import_workers: int = 4  # background import jobs running at once
+    import_per_domain: int = 1  # default cap on concurrent jobs against one site
+    import_domain_limits: dict[str, int] = {}  # per-site overrides, e.g. {"danbooru.donmai.us": 2}
+    upload_concurrency: int = 3  # files uploaded at once during an import
+    import_queue_size: int = 16  # downloaded files waiting for the upload stage
+    hash_workers: int = 4  # threads used to checksum downloaded media
+    upload_retries: int = 2  # post-creation retries after a 5xx; the uploaded content is reused
+    page_prefetch: int = 4  # list pages requested ahead of the one being processed
+    exists_cache_size: int = 20000  # tags/categories remembered as existing
+    exists_cache_ttl: float = 600.0  # seconds before an existence entry is re-checked
+    update_concurrency: int = 32  # max queued post/tag writes; the adaptive limit decides how many run
+    conflict_retries: int = 3  # refetch-and-retry attempts after a 409 version conflict
+    checkpoint_interval: float = 5.0  # seconds between progress checkpoints of a tag-tools run
+    checkpoint_ttl: float = 7 * 24 * 3600  # seconds before a finished run's checkpoint is removed
+    stream_batch_interval: float = 0.25  # seconds of tag-tools events coalesced into one SSE message
+    stream_batch_sample: int = 20  # per-item lines kept in each SSE batch; the rest go only to the report
+    job_replay_batches: int = 200  # recent SSE batches replayed to a late subscriber of a tag-tools job
+    report_details_sample: int = 100  # detail lines returned by non-streaming tag-tools calls; all are in the report
+    report_ttl: float = 7 * 24 * 3600  # seconds before a run's NDJSON report is removed
 
     model_config = {
         "env_prefix": "SZURU_",
@@ -0,0 +1,42 @@
+import re
+from urllib.parse import urlsplit
+
+from prometheus_client import Counter, Gauge, Histogram
+
+SZURU_REQUESTS = Counter(
+    'szuru_requests_total', 'Requests sent to Szurubooru', ['method', 'route', 'status']
+)
+SZURU_LATENCY = Histogram(
+    'szuru_request_duration_seconds', 'Szurubooru request latency', ['method', 'route', 'status'],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+SZURU_CONCURRENCY_LIMIT = Gauge('szuru_concurrency_limit', 'Current adaptive limit on in-flight Szurubooru requests')
+
+GALLERY_DL_RUNS = Counter('gallery_dl_runs_total', 'gallery-dl runs by exit code', ['exit_code'])
+GALLERY_DL_DURATION = Histogram(
+    'gallery_dl_duration_seconds', 'gallery-dl run duration',
+    buckets=(1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600),
+)
+
+UPLOAD_BYTES = Counter('upload_bytes_total', 'Media bytes uploaded to Szurubooru')
+POSTS_UPDATED = Counter('posts_updated_total', 'Posts updated with missing implications')
+TAGS_DELETED = Counter('tags_deleted_total', 'Unused tags deleted')
+
+ACTIVE_JOBS = Gauge('active_jobs', 'Background jobs currently running', ['kind'])
+ACTIVE_STREAMS = Gauge('active_streams', 'Progress streams currently open', ['kind'])
+
+# Collapse ids and names so each API route is one label value
+_ROUTES = [
+    (re.compile(r'^api/post/\d+'), 'api/post/{id}'),
+    (re.compile(r'^api/tag/[^/]+$'), 'api/tag/{name}'),
+    (re.compile(r'^api/tag-category/[^/]+$'), 'api/tag-category/{name}'),
+]
+
+
+def route_label(url: str, base_url: str = '') -> str:
+    path = url[len(base_url):] if base_url and url.startswith(base_url) else urlsplit(url).path
+    path = path.split('?', 1)[0].strip('/')
+    for pattern, label in _ROUTES:
+        if pattern.match(path):
+            return label
+    return path + '/' if path in ('api/posts', 'api/tags') else path
@@ -1,12 +1,42 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
 from pathlib import Path
 
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Request, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 
 from app.api.routes import router
+from app.core.config import settings
+from app.services.downloader import cleanup_work_dirs_periodically
+from app.services.import_jobs import get_import_queue
+from app.services.szuru_client import szuru_client
+from app.services.tag_jobs import get_tag_jobs
 
-app = FastAPI(title="Szuru Importer")
+logging.basicConfig(
+    level=settings.log_level.upper(),
+    format="%(asctime)s %(levelname)s %(name)s %(message)s",
+)
+# httpx logs every request at INFO; the per-route metrics cover that
+logging.getLogger('httpx').setLevel(logging.WARNING)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Resume queued/interrupted import jobs
+    queue = get_import_queue()
+    await queue.start()
+    cleanup = asyncio.create_task(cleanup_work_dirs_periodically())
+    yield
+    cleanup.cancel()
+    await queue.stop()
+    await get_tag_jobs().stop()
+    await szuru_client.aclose()
+
+
+app = FastAPI(title="Szuru Importer", lifespan=lifespan)
 app.include_router(router, prefix="/api")
 
 # Static files
@@ -24,6 +54,11 @@ async def health_check():
     return {"status": "healthy", "service": "szuru-webtools"}
 
 
+@app.get('/metrics')
+async def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
 @app.get('/')
 async def import_page(request: Request):
     return templates.TemplateResponse("import.html", {"request": request})
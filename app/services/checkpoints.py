@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import json
+import os
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any
+
+from app.core.config import settings
+
+
+def checkpoints_dir() -> Path:
+    return settings.state_dir / 'checkpoints'
+
+
+def _path(run_id: str) -> Path | None:
+    path = checkpoints_dir() / f'{run_id}.json'
+    return path if path.parent == checkpoints_dir() else None
+
+
+@dataclass
+class Checkpoint:
+    """Progress of an apply-implications run, saved so it can resume after an interruption.
+
+    Tag-driven runs record the tags they have finished; full scans record the
+    highest post id below which every post has been checked and written.
+    """
+    tags: list[str] = field(default_factory=list)
+    dry_run: bool = False
+    full_scan: bool = False
+    incremental: bool = False
+    run_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    started: float = field(default_factory=time.time)
+    counters: dict[str, int] = field(default_factory=dict)
+    done_tags: list[str] = field(default_factory=list)
+    last_post_id: int = 0
+    complete: bool = False
+    updated: float = 0.0
+    _saved_at: float = field(default=0.0, repr=False, compare=False)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {k: v for k, v in asdict(self).items() if not k.startswith('_')}
+
+    def save(self) -> None:
+        """Write the checkpoint atomically, so a crash mid-write keeps the previous one"""
+        self.updated = time.time()
+        self._saved_at = time.monotonic()
+        checkpoints_dir().mkdir(parents=True, exist_ok=True)
+        path = checkpoints_dir() / f'{self.run_id}.json'
+        tmp = path.with_suffix('.tmp')
+        tmp.write_text(json.dumps(self.to_dict()))
+        os.replace(tmp, path)
+
+    def maybe_save(self) -> None:
+        """Save unless the last save was less than ``SZURU_CHECKPOINT_INTERVAL`` ago"""
+        if time.monotonic() - self._saved_at >= settings.checkpoint_interval:
+            self.save()
+
+    @classmethod
+    def load(cls, run_id: str) -> Checkpoint | None:
+        path = _path(run_id)
+        if path is None or not path.is_file():
+            return None
+        data = json.loads(path.read_text())
+        return cls(**{k: v for k, v in data.items() if k in cls.__dataclass_fields__})
+
+
+def list_checkpoints(include_complete: bool = False) -> list[dict[str, Any]]:
+    """Saved runs, most recently updated first"""
+    if not checkpoints_dir().is_dir():
+        return []
+    runs = []
+    for path in checkpoints_dir().glob('*.json'):
+        try:
+            data = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue
+        if include_complete or not data.get('complete'):
+            runs.append(data)
+    return sorted(runs, key=lambda r: r.get('updated', 0), reverse=True)
+
+
+def prune_checkpoints(max_age: float | None = None) -> None:
+    """Remove checkpoints of finished runs older than ``max_age`` (default ``SZURU_CHECKPOINT_TTL``)"""
+    cutoff = time.time() - (settings.checkpoint_ttl if max_age is None else max_age)
+    for run in list_checkpoints(include_complete=True):
+        if run.get('complete') and run.get('updated', 0) < cutoff:
+            path = _path(run['run_id'])
+            if path is not None:
+                path.unlink(missing_ok=True)
+
+
+@dataclass
+class Watermark:
+    """Where the last complete full or incremental apply-implications run left off.
+
+    ``started`` is when that run began, so edits made while it ran are picked
+    up next time; ``closures`` holds ``ImplicationResolver.digests()`` so
+    implications added or changed since can be told apart.
+    """
+    started: float
+    max_post_id: int
+    closures: dict[str, str] = field(default_factory=dict)
+
+    @staticmethod
+    def path() -> Path:
+        return settings.state_dir / 'implications-watermark.json'
+
+    @classmethod
+    def load(cls) -> Watermark | None:
+        try:
+            data = json.loads(cls.path().read_text())
+        except (OSError, ValueError):
+            return None
+        return cls(**{k: v for k, v in data.items() if k in cls.__dataclass_fields__})
+
+    def save(self) -> None:
+        self.path().parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path().with_suffix('.tmp')
+        tmp.write_text(json.dumps(asdict(self)))
+        os.replace(tmp, self.path())
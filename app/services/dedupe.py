@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import sqlite3
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from app.core.config import settings
+
+from .szuru_client import SzuruClient
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def file_checksum(path: Path) -> str:
+    """SHA-1 of a file, matching the ``checksum`` field Szurubooru reports for posts"""
+    digest = hashlib.sha1()  # content fingerprint, not security
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+_hash_executor: ThreadPoolExecutor | None = None
+
+
+async def hash_files(paths: Iterable[Path]) -> dict[Path, str]:
+    """Checksum files in a thread pool so hashing large media doesn't block the event loop"""
+    global _hash_executor
+    if _hash_executor is None:
+        _hash_executor = ThreadPoolExecutor(max_workers=settings.hash_workers, thread_name_prefix='hash')
+    loop = asyncio.get_running_loop()
+    paths = list(paths)
+    digests = await asyncio.gather(*(loop.run_in_executor(_hash_executor, file_checksum, p) for p in paths))
+    return dict(zip(paths, digests))
+
+
+class DedupeIndex:
+    """Persistent checksum -> post id map of content already on the booru."""
+
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS posts (checksum TEXT PRIMARY KEY, post_id INTEGER NOT NULL)'
+        )
+        self._db.commit()
+
+    def lookup(self, checksum: str) -> int | None:
+        row = self._db.execute('SELECT post_id FROM posts WHERE checksum = ?', (checksum,)).fetchone()
+        return row[0] if row else None
+
+    def add(self, checksum: str, post_id: int) -> None:
+        self.add_many([(checksum, post_id)])
+
+    def add_many(self, rows: Iterable[tuple[str, int]]) -> None:
+        with self._db:
+            self._db.executemany('INSERT OR REPLACE INTO posts (checksum, post_id) VALUES (?, ?)', rows)
+
+    def __len__(self) -> int:
+        return self._db.execute('SELECT COUNT(*) FROM posts').fetchone()[0]
+
+    def close(self) -> None:
+        self._db.close()
+
+
+async def sync_index(client: SzuruClient, index: DedupeIndex) -> int:
+    """Load the checksum of every existing post into the index, walking posts by id; returns how many were seen"""
+    seen = 0
+    async for page in client.iter_posts_by_id(fields=('id', 'checksum')):
+        rows = [(p['checksum'], p['id']) for p in page.results if p.get('checksum') and p.get('id')]
+        index.add_many(rows)
+        seen += len(rows)
+    return seen
+
+
+_index: DedupeIndex | None = None
+
+
+def get_dedupe_index() -> DedupeIndex:
+    global _index
+    if _index is None:
+        _index = DedupeIndex(settings.state_dir / 'dedupe.sqlite3')
+    return _index
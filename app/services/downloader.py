@@ -1,10 +1,19 @@
 import asyncio
-import json
+import logging
+import shutil
+import time
+import uuid
+from collections import deque
+from collections.abc import AsyncIterator
 from pathlib import Path
 
 from app.core.config import settings
+from app.core.metrics import GALLERY_DL_DURATION, GALLERY_DL_RUNS
 
-from .tag_logic import normalize_tag
+from .metadata import read_metadata
+from .profiling import record as record_span
+
+logger = logging.getLogger(__name__)
 
 GDL_BIN = 'gallery-dl'
 
@@ -13,55 +22,102 @@ class DownloadResult:
         self.base_dir = base_dir
         self.files = files
 
-async def run_gallery_dl(url: str, dest: Path | None = None) -> DownloadResult:
-    dest = dest or settings.download_dir
+_active_work_dirs: set[Path] = set()
+
+
+def work_dirs_root() -> Path:
+    return settings.download_dir / 'jobs'
+
+
+def new_work_dir(name: str | None = None) -> Path:
+    """Create a private download directory for one gallery-dl run"""
+    name = name or f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    path = work_dirs_root() / name
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def cleanup_work_dirs(max_age: float | None = None) -> list[Path]:
+    """Remove job directories untouched for ``max_age`` seconds, skipping ones in use"""
+    max_age = settings.work_dir_ttl if max_age is None else max_age
+    root = work_dirs_root()
+    if not root.exists():
+        return []
+    cutoff = time.time() - max_age
+    removed = []
+    for path in root.iterdir():
+        if not path.is_dir() or path in _active_work_dirs:
+            continue
+        try:
+            if path.stat().st_mtime < cutoff:
+                shutil.rmtree(path)
+                removed.append(path)
+        except OSError:
+            continue
+    return removed
+
+
+async def cleanup_work_dirs_periodically() -> None:
+    while True:
+        await asyncio.to_thread(cleanup_work_dirs)
+        await asyncio.sleep(settings.work_dir_cleanup_interval)
+
+
+async def iter_gallery_dl(url: str, dest: Path | None = None) -> AsyncIterator[Path]:
+    """Run gallery-dl and yield each media file as soon as it has finished downloading.
+
+    gallery-dl runs in ``pipe`` output mode, where it prints the full path of
+    every completed file (after its metadata sidecar is written) on stdout and
+    logs to stderr. That output is the run's file manifest, so discovery never
+    has to list the download directory. Each run gets its own work directory
+    unless ``dest`` is given. Raises RuntimeError once the process exits non-zero.
+    """
+    dest = dest or new_work_dir()
     dest.mkdir(parents=True, exist_ok=True)
+    _active_work_dirs.add(dest)
     # Use --write-metadata for JSON sidecars if supported
-    cmd = [GDL_BIN, '--write-metadata', '--no-skip', '-D', str(dest), url]
-    proc = await asyncio.create_subprocess_exec(*cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT)
-    out = []
-    async for line_b in proc.stdout:  # type: ignore
-        line = line_b.decode(errors='ignore').rstrip()
-        out.append(line)
-    rc = await proc.wait()
+    cmd = [GDL_BIN, '--write-metadata', '--no-skip', '-o', 'output.mode=pipe', '-D', str(dest), url]
+    started = time.monotonic()
+    proc = await asyncio.create_subprocess_exec(*cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+    log: deque[str] = deque(maxlen=40)
+
+    async def read_log():
+        async for line_b in proc.stderr:  # type: ignore
+            log.append(line_b.decode(errors='ignore').rstrip())
+
+    log_reader = asyncio.create_task(read_log())
+    try:
+        async for line_b in proc.stdout:  # type: ignore
+            line = line_b.decode(errors='ignore').rstrip()
+            log.append(line)
+            # '# <path>' marks a file gallery-dl skipped
+            if not line or line.startswith('# '):
+                continue
+            path = Path(line)
+            if path.is_file() and not path.name.endswith('.json'):
+                yield path
+        rc = await proc.wait()
+        await log_reader
+    finally:
+        if proc.returncode is None:
+            proc.kill()
+            await proc.wait()
+        log_reader.cancel()
+        _active_work_dirs.discard(dest)
+        GALLERY_DL_RUNS.labels(str(proc.returncode)).inc()
+        GALLERY_DL_DURATION.observe(time.monotonic() - started)
+        record_span('gallery_dl', time.monotonic() - started)
+    logger.info("gallery-dl finished url=%s exit_code=%d dir=%s", url, rc, dest)
     if rc != 0:
-        raise RuntimeError(f"gallery-dl exit {rc}\n" + '\n'.join(out[-40:]))
-    files = [p for p in dest.iterdir() if p.is_file() and not p.name.endswith('.json')]
-    return DownloadResult(dest, files)
+        raise RuntimeError(f"gallery-dl exit {rc}\n" + '\n'.join(log))
 
-metadata_suffixes = ['.json', '.info.json']
+async def run_gallery_dl(url: str, dest: Path | None = None) -> DownloadResult:
+    dest = dest or new_work_dir()
+    files = [path async for path in iter_gallery_dl(url, dest)]
+    return DownloadResult(dest, files)
 
 def collect_tags_for_file(media_path: Path) -> list[str]:
-    # try metadata json sidecars
-    tags: set[str] = set()
-    for suf in metadata_suffixes:
-        mp = media_path.with_name(media_path.name + suf)
-        if mp.exists():
-            try:
-                data = json.loads(mp.read_text(errors='ignore'))
-                for key in ('tags','keywords'):
-                    val = data.get(key)
-                    if isinstance(val, list):
-                        for t in val:
-                            nt = normalize_tag(str(t))
-                            if nt:
-                                tags.add(nt)
-            except Exception:
-                pass
-    return sorted(tags)
+    return read_metadata(media_path).raw_tags()
 
 def collect_source_for_file(media_path: Path) -> str | None:
-    # try metadata json sidecars for source URL
-    for suf in metadata_suffixes:
-        mp = media_path.with_name(media_path.name + suf)
-        if mp.exists():
-            try:
-                data = json.loads(mp.read_text(errors='ignore'))
-                # Common source URL fields from gallery-dl
-                for key in ('source', 'webpage_url', 'url', 'original_url', 'extractor_url'):
-                    val = data.get(key)
-                    if val and isinstance(val, str) and val.startswith('http'):
-                        return val
-            except Exception:
-                pass
-    return None
+    return read_metadata(media_path).source
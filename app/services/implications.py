@@ -0,0 +1,467 @@
+from __future__ import annotations
+
+from collections import deque
+from collections.abc import AsyncIterator
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+from app.core.config import settings
+from app.core.metrics import POSTS_UPDATED
+
+from .checkpoints import Checkpoint, Watermark, prune_checkpoints
+from .profiling import run_timer, span
+from .szuru_client import IMPLYING_TAGS_QUERY, POST_TAG_FIELDS, SzuruClient, SzuruError
+from .tag_graph import ImplicationResolver
+from .tag_logic import normalize_tag
+from .workers import WorkerPool
+
+
+def post_tag_names(post: dict[str, Any]) -> list[str]:
+    """Primary names of the tags attached to a post resource."""
+    names = [t.get('names', [None])[0] for t in post.get('tags', []) if t.get('names')]
+    return [n for n in names if n]
+
+
+async def apply_implications(
+    client: SzuruClient,
+    tags: list[str],
+    *,
+    dry_run: bool = False,
+    full_scan: bool = False,
+    incremental: bool = False,
+    profile: bool = False,
+    resume_id: str | None = None,
+) -> AsyncIterator[dict[str, Any]]:
+    """Add missing implied tags to posts, yielding progress events as it goes.
+
+    Each event is a dict with a ``type`` (status, info, progress, success,
+    error, summary, complete) and either a ``message`` or ``data``. Every post
+    is resolved against the transitive implication closure and written with a
+    single merged PUT, however many of its tags imply something. The
+    ``complete`` event carries the run's id and per-phase timings.
+
+    Progress is checkpointed under the run id (sent with the first event);
+    passing it back as ``resume_id`` continues an interrupted run with its
+    original tags and options, skipping the work already done. A run that
+    hit errors (a failed listing or post update) stays resumable too, and a
+    resume retries from the first post or tag that failed.
+
+    Complete full and ``incremental`` runs leave a Watermark behind; an
+    incremental run then only checks posts edited or created since the last
+    one, plus the posts of tags whose implications changed in the meantime.
+    """
+    counters = {
+        'processed_tags': 0,
+        'posts_found': 0,
+        'posts_to_update': 0,
+        'posts_updated': 0,
+        'implications_added': 0,
+    }
+
+    if resume_id:
+        checkpoint = Checkpoint.load(resume_id)
+        if checkpoint is None:
+            yield {'type': 'error', 'message': f'No checkpoint found for run {resume_id}'}
+            return
+        tags, dry_run, full_scan = checkpoint.tags, checkpoint.dry_run, checkpoint.full_scan
+        incremental = checkpoint.incremental
+        counters.update(checkpoint.counters)
+    else:
+        prune_checkpoints()
+        checkpoint = Checkpoint(tags=list(tags), dry_run=dry_run, full_scan=full_scan, incremental=incremental)
+    # The checkpoint only counts work a resume won't repeat; the scans advance it
+    checkpoint.counters = dict(counters)
+    # Saved up front so the run can be resumed however early it stops
+    checkpoint.save()
+
+    with run_timer('apply_implications', profile, run_id=checkpoint.run_id) as timer:
+        if checkpoint.complete:
+            yield {'type': 'info', 'message': f'Run {checkpoint.run_id} already completed', 'run_id': checkpoint.run_id}
+            yield {'type': 'complete', 'data': counters, 'message': 'APPLICATION COMPLETE',
+                   'run_id': timer.run_id, 'timings': timer.summary()}
+            return
+        if resume_id:
+            yield {'type': 'status', 'run_id': checkpoint.run_id,
+                   'message': f'Resuming run {checkpoint.run_id}...'}
+        else:
+            yield {'type': 'status', 'run_id': checkpoint.run_id, 'message': 'Starting tag implication process...'}
+
+        # Snapshot the implying tags once; every implication lookup below is answered from it
+        try:
+            graph = await client.get_tag_graph(IMPLYING_TAGS_QUERY)
+        except Exception as e:
+            yield {'type': 'error', 'message': f'Error loading tag graph: {e}'}
+            return
+        resolver = ImplicationResolver(graph)
+
+        with span('closure'):
+            cycles = resolver.cycles
+        for cycle in cycles:
+            yield {'type': 'info', 'message': f"Implication cycle detected between: {', '.join(cycle)}"}
+
+        previous = Watermark.load() if incremental else None
+        if incremental and previous is None:
+            yield {'type': 'info', 'message': 'No watermark from an earlier run yet; doing a full scan instead'}
+            full_scan, incremental = True, False
+        if full_scan:
+            scan = _scan_all_posts(client, resolver, counters, dry_run, checkpoint)
+        elif incremental and previous is not None:
+            scan = _scan_changes(client, resolver, counters, dry_run, checkpoint, previous)
+        else:
+            scan = _scan_tags(client, resolver, tags, counters, dry_run, checkpoint)
+        errors = 0
+        try:
+            async for event in scan:
+                errors += event['type'] == 'error'
+                yield event
+        finally:
+            # Whatever happened, keep what was finished for a later resume
+            checkpoint.save()
+
+        # A failed listing or write leaves the run resumable, to pick up what it missed
+        if not errors:
+            checkpoint.complete = True
+            checkpoint.counters = counters
+            checkpoint.save()
+        if (full_scan or incremental) and not dry_run and not errors:
+            max_post_id = max(checkpoint.last_post_id, previous.max_post_id if previous else 0)
+            Watermark(started=checkpoint.started, max_post_id=max_post_id, closures=resolver.digests()).save()
+        final_message = "DRY RUN COMPLETE" if dry_run else "APPLICATION COMPLETE"
+        if full_scan:
+            final_message += " (FULL SCAN)"
+        elif incremental:
+            final_message += " (INCREMENTAL)"
+        if errors:
+            final_message += f" with {errors} errors; resume run {checkpoint.run_id} to retry what failed"
+        yield {'type': 'complete', 'data': counters, 'message': final_message, 'resumable': not checkpoint.complete,
+               'run_id': timer.run_id, 'timings': timer.summary()}
+
+
+async def _fix_post(
+    client: SzuruClient,
+    post: dict[str, Any],
+    missing: list[str],
+    resolver: ImplicationResolver,
+    roots: set[str] | None,
+    counters: dict[str, int],
+    dry_run: bool,
+) -> dict[str, Any]:
+    """Write one post's missing implications, refetching and retrying on version conflicts."""
+    post_id = post.get('id')
+    if dry_run:
+        counters['implications_added'] += len(missing)
+        return {'type': 'info', 'post_id': post_id, 'message': f"Post {post_id}: Would add {', '.join(missing)}"}
+
+    current_tags = post_tag_names(post)
+    version = post.get('version')
+    for attempt in range(settings.conflict_retries + 1):
+        try:
+            await client.update_post_tags(post_id, current_tags + missing, version)
+            break
+        except SzuruError as e:
+            if not e.is_conflict or attempt == settings.conflict_retries:
+                return {'type': 'error', 'post_id': post_id, 'message': f'Failed to update post {post_id}: {e}'}
+        except Exception as e:
+            return {'type': 'error', 'post_id': post_id, 'message': f'Failed to update post {post_id}: {e}'}
+        # Someone else edited the post since we read it: start again from its current state
+        try:
+            fresh = await client.get_post(post_id)
+        except Exception as e:
+            return {'type': 'error', 'post_id': post_id, 'message': f'Failed to refetch post {post_id} after conflict: {e}'}
+        current_tags = post_tag_names(fresh)
+        version = fresh.get('version')
+        missing = resolver.missing(current_tags, roots)
+        if not missing:
+            return {'type': 'info', 'post_id': post_id, 'message': f'Post {post_id}: Already up to date after concurrent edit'}
+
+    counters['posts_updated'] += 1
+    counters['implications_added'] += len(missing)
+    POSTS_UPDATED.inc()
+    return {'type': 'success', 'post_id': post_id, 'message': f"Post {post_id}: Added {', '.join(missing)}"}
+
+
+async def _scan_tags(
+    client: SzuruClient,
+    resolver: ImplicationResolver,
+    tags: list[str],
+    counters: dict[str, int],
+    dry_run: bool,
+    checkpoint: Checkpoint,
+    seen_posts: set[int] | None = None,
+    redo: dict[str, int] | None = None,
+) -> AsyncIterator[dict[str, Any]]:
+    """Tag-driven scan: search the posts of each requested tag.
+
+    Posts in ``seen_posts`` (and any checked along the way) are skipped. A
+    tag is marked done only once all of its posts were written; ``redo``
+    holds counts of earlier work a resume repeats, left out of the
+    checkpoint's counters.
+    """
+    roots = {t for t in (normalize_tag(tag) for tag in tags) if t}
+    seen_posts = set() if seen_posts is None else seen_posts
+    done = set(checkpoint.done_tags)
+    total_tags = len(tags)
+
+    def mark_done(tag: str) -> None:
+        checkpoint.done_tags.append(tag)
+        checkpoint.counters = {key: n - (redo or {}).get(key, 0) for key, n in counters.items()}
+
+    for tag_index, tag in enumerate(tags):
+        normalized_tag = normalize_tag(tag)
+        if not normalized_tag or normalized_tag in done:
+            continue
+
+        counters['processed_tags'] += 1
+        yield {'type': 'progress', 'current': tag_index + 1, 'total': total_tags, 'tag': normalized_tag,
+               'limit': client.limiter.snapshot()['limit']}
+
+        try:
+            implied = sorted(resolver.closure(normalized_tag))
+            if not implied:
+                yield {'type': 'info', 'message': f'No implications found for tag: {normalized_tag}'}
+                mark_done(normalized_tag)
+                continue
+
+            yield {'type': 'info', 'message': f"Tag {normalized_tag} implies: {', '.join(implied)}"}
+
+            posts_found_for_tag = 0
+            posts_updated_for_tag = 0
+            failed_for_tag = 0
+            pool: WorkerPool[dict[str, Any]] = WorkerPool(settings.update_concurrency)
+            try:
+                async for post in client.iter_posts(f"tag:{normalized_tag}", fields=POST_TAG_FIELDS):
+                    posts_found_for_tag += 1
+                    # Posts already fixed via an earlier tag got their full closure in that PUT
+                    if post['id'] in seen_posts:
+                        continue
+                    seen_posts.add(post['id'])
+                    counters['posts_found'] += 1
+
+                    missing = resolver.missing(post_tag_names(post), roots)
+                    if missing:
+                        counters['posts_to_update'] += 1
+                        await pool.submit(_fix_post(client, post, missing, resolver, roots, counters, dry_run))
+                    for event in pool.completed():
+                        failed_for_tag += event['type'] == 'error'
+                        if event['type'] == 'success' or dry_run:
+                            posts_updated_for_tag += 1
+                        yield event
+                async for event in pool.drain():
+                    failed_for_tag += event['type'] == 'error'
+                    if event['type'] == 'success' or dry_run:
+                        posts_updated_for_tag += 1
+                    yield event
+            finally:
+                await pool.close()
+
+            if not failed_for_tag:
+                mark_done(normalized_tag)
+                checkpoint.maybe_save()
+
+            if posts_found_for_tag == 0:
+                yield {'type': 'info', 'message': f'No posts found with tag: {normalized_tag}'}
+                continue
+
+            yield {'type': 'info', 'message': f'Found {posts_found_for_tag} posts with tag: {normalized_tag}'}
+
+            if dry_run:
+                summary_msg = f'DRY RUN: Would update {posts_updated_for_tag} posts for tag {normalized_tag}'
+            else:
+                summary_msg = f'Updated {posts_updated_for_tag} posts for tag {normalized_tag}'
+            yield {'type': 'summary', 'message': summary_msg}
+
+        except Exception as e:
+            yield {'type': 'error', 'message': f'Error processing tag {normalized_tag}: {e}'}
+
+
+class _Watermark:
+    """Tracks the highest post id below which every post has been checked and written.
+
+    Writes finish out of order, so the safe point trails the scan position
+    while any earlier post is still in flight, and stays before a post whose
+    write failed so a resume retries it. ``counters()`` gives the run's
+    counters for the posts up to that point, which a resume won't count again.
+    """
+
+    def __init__(self, start: int, counters: dict[str, int]):
+        self.seen = start
+        self.pending: set[int] = set()
+        self._committed = dict(counters)
+        self._open: deque[tuple[int, dict[str, int]]] = deque()
+
+    @property
+    def value(self) -> int:
+        return min(self.pending) - 1 if self.pending else self.seen
+
+    def scanned(self, post_id: int) -> dict[str, int]:
+        """Record a post as read; the returned dict collects what it adds to the counters"""
+        self.seen = post_id
+        delta = {'posts_found': 1}
+        self._open.append((post_id, delta))
+        return delta
+
+    def counters(self) -> dict[str, int]:
+        value = self.value
+        while self._open and self._open[0][0] <= value:
+            _, delta = self._open.popleft()
+            for key, n in delta.items():
+                self._committed[key] = self._committed.get(key, 0) + n
+        return dict(self._committed)
+
+
+async def _scan_all_posts(
+    client: SzuruClient,
+    resolver: ImplicationResolver,
+    counters: dict[str, int],
+    dry_run: bool,
+    checkpoint: Checkpoint,
+) -> AsyncIterator[dict[str, Any]]:
+    """Post-centric scan: walk the whole corpus once in id order.
+
+    Every post is read exactly once and checked against all implications in
+    memory, so reads scale with the number of posts rather than with the sum
+    of usages of every implying tag. Pages are id ranges rather than
+    offsets, so they stay cheap deep into the corpus and don't shift when
+    posts are deleted mid-scan, and upcoming ranges are prefetched while
+    the current one is checked. A resumed scan starts after the checkpoint's
+    ``last_post_id``.
+    """
+    tags_with_implications = resolver.graph.tags_with_implications()
+    counters['processed_tags'] = len(tags_with_implications)
+    yield {'type': 'status', 'message': f'Full scan mode: checking every post against {len(tags_with_implications)} tags with implications...'}
+    if not tags_with_implications:
+        return
+    if checkpoint.last_post_id:
+        yield {'type': 'info', 'message': f'Skipping posts up to #{checkpoint.last_post_id}, already checked'}
+
+    watermark = _Watermark(checkpoint.last_post_id, counters)
+    pool: WorkerPool[dict[str, Any]] = WorkerPool(settings.update_concurrency)
+    try:
+        try:
+            async for event in _walk_posts(client, resolver, counters, dry_run, pool, watermark, checkpoint):
+                yield event
+        except Exception as e:
+            yield {'type': 'error', 'message': f'Error listing posts: {e}'}
+        async for event in pool.drain():
+            yield event
+    finally:
+        await pool.close()
+        checkpoint.last_post_id = watermark.value
+        checkpoint.counters = watermark.counters()
+
+    if dry_run:
+        summary_msg = f"DRY RUN: Would update {counters['posts_to_update']} of {counters['posts_found']} posts"
+    else:
+        summary_msg = f"Updated {counters['posts_updated']} of {counters['posts_found']} posts"
+    yield {'type': 'summary', 'message': summary_msg}
+
+
+async def _walk_posts(
+    client: SzuruClient,
+    resolver: ImplicationResolver,
+    counters: dict[str, int],
+    dry_run: bool,
+    pool: WorkerPool[dict[str, Any]],
+    watermark: _Watermark,
+    checkpoint: Checkpoint,
+) -> AsyncIterator[dict[str, Any]]:
+    async def fix(post: dict[str, Any], missing: list[str], delta: dict[str, int]) -> dict[str, Any]:
+        written = {'posts_updated': 0, 'implications_added': 0}
+        event = await _fix_post(client, post, missing, resolver, None, written, dry_run)
+        for key, n in written.items():
+            counters[key] += n
+            delta[key] = n
+        if event['type'] != 'error':
+            watermark.pending.discard(post['id'])
+        return event
+
+    already_found = counters['posts_found']
+    async for page in client.iter_posts_by_id(after=watermark.seen, fields=POST_TAG_FIELDS):
+        counters['posts_found'] += len(page.results)
+        page_missing = resolver.missing_many(post_tag_names(post) for post in page.results)
+        for post, missing in zip(page.results, page_missing):
+            delta = watermark.scanned(post['id'])
+            if missing:
+                counters['posts_to_update'] += 1
+                delta['posts_to_update'] = 1
+                watermark.pending.add(post['id'])
+                await pool.submit(fix(post, missing, delta))
+            for event in pool.completed():
+                yield event
+
+        checkpoint.last_post_id = watermark.value
+        checkpoint.counters = watermark.counters()
+        checkpoint.maybe_save()
+        total = already_found + page.total if page.total is not None else counters['posts_found']
+        yield {'type': 'progress', 'current': counters['posts_found'], 'total': total, 'post': page.results[-1].get('id'),
+               'limit': client.limiter.snapshot()['limit']}
+
+
+async def _scan_changes(
+    client: SzuruClient,
+    resolver: ImplicationResolver,
+    counters: dict[str, int],
+    dry_run: bool,
+    checkpoint: Checkpoint,
+    previous: Watermark,
+) -> AsyncIterator[dict[str, Any]]:
+    """Incremental scan: only what changed since ``previous``.
+
+    Posts edited since the previous run started (``last-edit-date``) and
+    posts created after its highest id (``id:N..``) are checked against every
+    implication first. Then the posts of tags whose implication closure
+    changed are repaired tag by tag, skipping those already checked.
+    Szurubooru filters edits by day, so the window reaches back an extra day
+    to cover time zones; re-checking a post that is already complete costs
+    only its read.
+    """
+    since = (datetime.fromtimestamp(previous.started, UTC) - timedelta(days=1)).date().isoformat()
+    # (filter, walk posts above this id)
+    queries = [(f'last-edit-date:{since}..', 0), ('', previous.max_post_id)]
+    yield {'type': 'status', 'message': f'Incremental mode: checking posts edited since {since} '
+                                       f'or newer than #{previous.max_post_id}...'}
+    seen: set[int] = set()
+    totals: dict[str, int] = {}
+    before = dict(counters)
+    pool: WorkerPool[dict[str, Any]] = WorkerPool(settings.update_concurrency)
+    try:
+        for query, after in queries:
+            try:
+                async for page in client.iter_posts_by_id(query, after=after, fields=POST_TAG_FIELDS):
+                    totals[query] = page.total or 0
+                    fresh = [post for post in page.results if post['id'] not in seen]
+                    for post, missing in zip(fresh, resolver.missing_many(post_tag_names(post) for post in fresh)):
+                        seen.add(post['id'])
+                        checkpoint.last_post_id = max(checkpoint.last_post_id, post['id'])
+                        counters['posts_found'] += 1
+                        if missing:
+                            counters['posts_to_update'] += 1
+                            await pool.submit(_fix_post(client, post, missing, resolver, None, counters, dry_run))
+                        for event in pool.completed():
+                            yield event
+                    total = max(len(seen), sum(totals.values()))  # the two queries may overlap
+                    yield {'type': 'progress', 'current': len(seen), 'total': total, 'post': page.results[-1].get('id'),
+                           'limit': client.limiter.snapshot()['limit']}
+            except Exception as e:
+                yield {'type': 'error', 'message': f"Error listing posts ({query or f'id:{after + 1}..'}): {e}"}
+        async for event in pool.drain():
+            yield event
+    finally:
+        await pool.close()
+
+    digests = resolver.digests()
+    changed = sorted(tag for tag, digest in digests.items() if previous.closures.get(tag) != digest)
+    if changed:
+        yield {'type': 'info', 'message': f"Implications changed for {len(changed)} tags: {', '.join(changed[:20])}"
+               + (' ...' if len(changed) > 20 else '')}
+        # A resume checks the edited and new posts again, so only the tag pass is checkpointed
+        redo = {key: n - before.get(key, 0) for key, n in counters.items()}
+        async for event in _scan_tags(client, resolver, changed, counters, dry_run, checkpoint, seen_posts=seen,
+                                      redo=redo):
+            yield event
+
+    if dry_run:
+        summary_msg = f"DRY RUN: Would update {counters['posts_to_update']} of {counters['posts_found']} changed posts"
+    else:
+        summary_msg = f"Updated {counters['posts_updated']} of {counters['posts_found']} changed posts"
+    yield {'type': 'summary', 'message': summary_msg}
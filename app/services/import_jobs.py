@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import sqlite3
+import time
+import uuid
+from pathlib import Path
+from typing import Any
+from urllib.parse import urlparse
+
+from app.core.config import settings
+from app.core.metrics import ACTIVE_JOBS
+
+from .downloader import new_work_dir
+from .importer import ImportResult, import_url
+from .szuru_client import SzuruClient
+
+MAX_STORED_DETAILS = 200
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    domain TEXT NOT NULL,
+    safety TEXT NOT NULL,
+    attach_source INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    downloaded INTEGER NOT NULL DEFAULT 0,
+    uploaded INTEGER NOT NULL DEFAULT 0,
+    skipped INTEGER NOT NULL DEFAULT 0,
+    errors INTEGER NOT NULL DEFAULT 0,
+    details TEXT NOT NULL DEFAULT '[]',
+    error TEXT,
+    run_id TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at);
+'''
+
+
+def url_domain(url: str) -> str:
+    host = (urlparse(url).hostname or '').lower()
+    return host.removeprefix('www.')
+
+
+class ImportJobQueue:
+    """Persistent queue of gallery-dl imports, run in the background.
+
+    Jobs live in SQLite (WAL mode) so queued and interrupted work survives a
+    restart. Up to ``SZURU_IMPORT_WORKERS`` jobs run at once, with at most
+    ``SZURU_IMPORT_PER_DOMAIN`` (or the per-site value in
+    ``SZURU_IMPORT_DOMAIN_LIMITS``) against any one site.
+    """
+
+    def __init__(self, path: Path, client: SzuruClient):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.client = client
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.executescript(_SCHEMA)
+        columns = {row['name'] for row in self._db.execute('PRAGMA table_info(jobs)')}
+        if 'run_id' not in columns:  # queues created before timings were recorded
+            self._db.execute('ALTER TABLE jobs ADD COLUMN run_id TEXT')
+        self._db.commit()
+        self._running: dict[str, tuple[asyncio.Task, ImportResult]] = {}
+        self._wakeup = asyncio.Event()
+        self._scheduler: asyncio.Task | None = None
+
+    # -- persistence ---------------------------------------------------
+
+    def enqueue(self, urls: list[str], safety: str = 'safe', attach_source: bool = False) -> list[dict[str, Any]]:
+        now = time.time()
+        rows = [
+            (uuid.uuid4().hex, url, url_domain(url), safety, int(attach_source), 'queued', now + i * 1e-6)
+            for i, url in enumerate(urls)
+        ]
+        with self._db:
+            self._db.executemany(
+                'INSERT INTO jobs (id, url, domain, safety, attach_source, status, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                rows,
+            )
+        self._wakeup.set()
+        return [self.get(row[0]) for row in rows]  # type: ignore[misc]
+
+    def get(self, job_id: str) -> dict[str, Any] | None:
+        row = self._db.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def list_jobs(self, status: str | None = None, limit: int = 100) -> list[dict[str, Any]]:
+        if status:
+            rows = self._db.execute(
+                'SELECT * FROM jobs WHERE status = ? ORDER BY created_at DESC LIMIT ?', (status, limit)
+            ).fetchall()
+        else:
+            rows = self._db.execute('SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?', (limit,)).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def counts(self) -> dict[str, int]:
+        rows = self._db.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall()
+        return {status: count for status, count in rows}
+
+    def _to_dict(self, row: sqlite3.Row) -> dict[str, Any]:
+        job = dict(row)
+        job['attach_source'] = bool(job['attach_source'])
+        job['details'] = json.loads(job['details'])
+        running = self._running.get(job['id'])
+        if running:
+            # Live progress of a running job isn't persisted until it finishes
+            result = running[1]
+            job.update(downloaded=result.downloaded, uploaded=result.uploaded,
+                       skipped=result.skipped, errors=result.errors,
+                       details=result.details[-MAX_STORED_DETAILS:], run_id=result.run_id)
+        return job
+
+    def _finish(self, job_id: str, status: str, result: ImportResult, error: str | None = None) -> None:
+        with self._db:
+            self._db.execute(
+                '''UPDATE jobs SET status = ?, finished_at = ?, downloaded = ?, uploaded = ?, skipped = ?,
+                   errors = ?, details = ?, error = ?, run_id = ? WHERE id = ?''',
+                (status, time.time(), result.downloaded, result.uploaded, result.skipped, result.errors,
+                 json.dumps(result.details[-MAX_STORED_DETAILS:]), error, result.run_id, job_id),
+            )
+
+    # -- scheduling ----------------------------------------------------
+
+    def _domain_limit(self, domain: str) -> int:
+        return settings.import_domain_limits.get(domain, settings.import_per_domain)
+
+    def _next_jobs(self) -> list[sqlite3.Row]:
+        free = settings.import_workers - len(self._running)
+        if free <= 0:
+            return []
+        busy: dict[str, int] = {}
+        for job_id in self._running:
+            row = self._db.execute('SELECT domain FROM jobs WHERE id = ?', (job_id,)).fetchone()
+            busy[row['domain']] = busy.get(row['domain'], 0) + 1
+        picked = []
+        for row in self._db.execute("SELECT * FROM jobs WHERE status = 'queued' ORDER BY created_at"):
+            if busy.get(row['domain'], 0) >= self._domain_limit(row['domain']):
+                continue
+            busy[row['domain']] = busy.get(row['domain'], 0) + 1
+            picked.append(row)
+            if len(picked) >= free:
+                break
+        return picked
+
+    async def _schedule(self) -> None:
+        while True:
+            self._wakeup.clear()
+            for row in self._next_jobs():
+                with self._db:
+                    self._db.execute(
+                        "UPDATE jobs SET status = 'running', started_at = ? WHERE id = ?", (time.time(), row['id'])
+                    )
+                result = ImportResult()
+                task = asyncio.create_task(self._run(row, result))
+                self._running[row['id']] = (task, result)
+            await self._wakeup.wait()
+
+    async def _run(self, row: sqlite3.Row, result: ImportResult) -> None:
+        ACTIVE_JOBS.labels('import').inc()
+        try:
+            await import_url(
+                self.client, row['url'], safety=row['safety'], attach_source=bool(row['attach_source']),
+                dest=new_work_dir(row['id']), result=result,
+            )
+            self._finish(row['id'], 'done', result)
+        except asyncio.CancelledError:
+            # Shutdown: leave the job 'running' so start() requeues it
+            raise
+        except Exception as e:
+            self._finish(row['id'], 'failed', result, error=str(e))
+        finally:
+            ACTIVE_JOBS.labels('import').dec()
+            self._running.pop(row['id'], None)
+            self._wakeup.set()
+
+    async def start(self) -> None:
+        """Requeue jobs interrupted by a restart and begin scheduling."""
+        with self._db:
+            self._db.execute("UPDATE jobs SET status = 'queued', started_at = NULL WHERE status = 'running'")
+        if self._scheduler is None:
+            self._scheduler = asyncio.create_task(self._schedule())
+
+    async def stop(self) -> None:
+        tasks = [task for task, _ in self._running.values()]
+        if self._scheduler is not None:
+            tasks.append(self._scheduler)
+            self._scheduler = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+_queue: ImportJobQueue | None = None
+
+
+def get_import_queue(client: SzuruClient | None = None) -> ImportJobQueue:
+    global _queue
+    if _queue is None:
+        from .szuru_client import szuru_client
+        _queue = ImportJobQueue(settings.state_dir / 'import-jobs.sqlite3', client or szuru_client)
+    return _queue
@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from app.core.config import settings
+
+from .dedupe import get_dedupe_index, hash_files
+from .downloader import iter_gallery_dl, new_work_dir
+from .metadata import read_metadata
+from .profiling import get_summary, run_timer
+from .szuru_client import SzuruClient
+from .tag_logic import tags_for_upload
+from .workers import WorkerPool
+
+
+@dataclass
+class ImportResult:
+    downloaded: int = 0
+    uploaded: int = 0
+    skipped: int = 0
+    errors: int = 0
+    details: list[str] = field(default_factory=list)
+    run_id: str | None = None
+    timings: dict[str, Any] = field(default_factory=dict)
+
+
+def move_to_processed(base_dir: Path, file: Path, details: list[str]) -> None:
+    """Move the media file and any metadata sidecars to ``base_dir/processed``"""
+    try:
+        processed_dir = base_dir / 'processed'
+        processed_dir.mkdir(parents=True, exist_ok=True)
+        # move the main file
+        target = processed_dir / file.name
+        file.replace(target)
+        # move sidecars if present
+        for suf in ('.json', '.info.json'):
+            side = file.with_name(file.name + suf)
+            if side.exists():
+                side.replace(processed_dir / side.name)
+    except Exception as e:
+        # record move errors but don't stop processing
+        details.append(f"Failed to move {file.name} to processed: {e}")
+
+
+async def import_file(
+    client: SzuruClient,
+    file: Path,
+    result: ImportResult,
+    *,
+    safety: str = 'safe',
+    attach_source: bool = False,
+) -> None:
+    """Dedupe, tag and upload one downloaded file, then move it to processed.
+
+    Processed media is kept under ``download_dir/processed``, outside the
+    work directory, so the work directory cleanup never deletes it.
+    """
+    index = get_dedupe_index()
+    try:
+        checksum = (await hash_files([file]))[file]
+        # infer tags, source and rating from the sidecars in one pass
+        meta = await asyncio.to_thread(read_metadata, file)
+        source_url = meta.source
+
+        existing = index.lookup(checksum)
+        if existing is not None:
+            result.skipped += 1
+            result.details.append(f"Skipped {file.name}: already uploaded as post {existing}")
+            if attach_source and source_url:
+                try:
+                    if await client.add_post_source(existing, source_url):
+                        result.details.append(f"Added source {source_url} to post {existing}")
+                except Exception as e:
+                    result.details.append(f"Failed to add source to post {existing}: {e}")
+            return
+
+        categories, upload_tags = tags_for_upload(meta.raw_tags())
+        # ensure categories + tags
+        order = 0
+        for cat in sorted(categories.keys()):
+            await client.ensure_category(cat, order=order)
+            order += 1
+            for tag in sorted(categories[cat]):
+                await client.ensure_tag(tag, cat)
+
+        if safety == 'auto':
+            safety = meta.safety or 'safe'
+        post = await client.upload_post(str(file), upload_tags, safety=safety, source=source_url)
+        result.uploaded += 1
+        if post.get('id'):
+            index.add(checksum, post['id'])
+    except Exception as e:
+        result.errors += 1
+        result.details.append(f"Upload failed {file.name}: {e}")
+    finally:
+        move_to_processed(settings.download_dir, file, result.details)
+
+
+async def import_url(
+    client: SzuruClient,
+    url: str,
+    *,
+    safety: str = 'safe',
+    attach_source: bool = False,
+    dest: Path | None = None,
+    result: ImportResult | None = None,
+    profile: bool = False,
+) -> ImportResult:
+    """Download ``url`` with gallery-dl and upload files while the download is still running.
+
+    The download stage pushes each finished file into a bounded queue that the
+    upload stage drains, so wall-clock time approaches max(download, upload)
+    rather than their sum. Up to ``SZURU_UPLOAD_CONCURRENCY`` files are
+    uploaded at once; each file is moved to processed once its own upload has
+    settled. Raises RuntimeError if gallery-dl fails before producing any file.
+    Files land in a private work directory (``dest`` or a new one under
+    ``download_dir/jobs``). Pass ``result`` to watch progress while it runs.
+    Per-phase timings end up in ``result.timings`` (see ``profiling``).
+    """
+    dest = dest or new_work_dir()
+    result = result if result is not None else ImportResult()
+    with run_timer('import', profile) as timer:
+        result.run_id = timer.run_id
+        queue: asyncio.Queue[Path | None] = asyncio.Queue(maxsize=settings.import_queue_size)
+
+        async def download():
+            try:
+                async for path in iter_gallery_dl(url, dest):
+                    result.downloaded += 1
+                    await queue.put(path)
+            finally:
+                await queue.put(None)
+
+        downloader = asyncio.create_task(download())
+        uploads: WorkerPool[None] = WorkerPool(settings.upload_concurrency)
+        try:
+            while (file := await queue.get()) is not None:
+                await uploads.submit(import_file(client, file, result, safety=safety, attach_source=attach_source))
+            async for _ in uploads.drain():
+                pass
+            await downloader
+        except RuntimeError as e:
+            if not result.downloaded:
+                raise
+            result.errors += 1
+            result.details.append(f"Download incomplete: {e}")
+        finally:
+            downloader.cancel()
+            await uploads.close()
+    result.timings = get_summary(timer.run_id) or {}
+    return result
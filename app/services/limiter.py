@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+
+class Slot:
+    """Handle for one in-flight request; set ``overloaded`` if the server pushed back."""
+    __slots__ = ('overloaded',)
+
+    def __init__(self):
+        self.overloaded = False
+
+
+class AdaptiveLimiter:
+    """AIMD concurrency limit driven by observed latency and overload responses.
+
+    Every request holds a slot while in flight. The limit grows by roughly one
+    slot per limit's worth of successful requests while each route's windowed
+    p95 latency stays within ``latency_tolerance`` times that route's no-load
+    baseline, and is cut multiplicatively (at most once per window) on 429/503,
+    transport errors or a rising p95. A single instance is shared by every bulk
+    path so they collectively back off when the backend is busy.
+
+    Latency is compared per route because one window mixing fast and slow
+    routes has a p95 well above the fastest route's baseline at any load.
+    Requests slotted without a route (such as uploads, whose latency follows
+    the file size) only count towards overload.
+    """
+
+    def __init__(
+        self,
+        initial: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 32,
+        latency_tolerance: float = 2.0,
+        backoff_ratio: float = 0.7,
+        window: int = 50,
+    ):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_tolerance = latency_tolerance
+        self.backoff_ratio = backoff_ratio
+        self.limit = float(max(min_limit, min(initial, max_limit)))
+        self.in_flight = 0
+        self.window = window
+        self.baselines: dict[str, float] = {}
+        self._latencies: dict[str, deque[float]] = {}
+        self._since_decrease = 0
+        self._cond: asyncio.Condition | None = None
+
+    def _condition(self) -> asyncio.Condition:
+        # Created lazily so the limiter can be built outside a running loop
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+        return self._cond
+
+    @staticmethod
+    def _p95(latencies: deque[float]) -> float:
+        ordered = sorted(latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    @property
+    def p95(self) -> float | None:
+        """p95 of the busiest route's window"""
+        busiest = max(self._latencies.values(), key=len, default=None)
+        return self._p95(busiest) if busiest else None
+
+    def snapshot(self) -> dict[str, float | int | None]:
+        return {'limit': round(self.limit, 2), 'in_flight': self.in_flight, 'p95': self.p95}
+
+    def _slow(self, route: str | None, latency: float) -> bool:
+        """Record a latency sample for ``route``; True once its window's p95 is past tolerance"""
+        if route is None:
+            return False
+        latencies = self._latencies.setdefault(route, deque(maxlen=self.window))
+        latencies.append(latency)
+        baseline = self.baselines.get(route)
+        if baseline is None:
+            baseline = latency
+        else:
+            # EWMA that follows faster samples quickly and slower ones slowly, so it tracks
+            # the route's unloaded latency without pinning it to one lucky sample
+            baseline += (latency - baseline) * (0.1 if latency < baseline else 0.01)
+        self.baselines[route] = baseline
+        return len(latencies) == self.window and self._p95(latencies) > baseline * self.latency_tolerance
+
+    def _record(self, latency: float, overloaded: bool, route: str | None = None) -> None:
+        self._since_decrease += 1
+        slow = self._slow(route, latency)
+
+        if overloaded:
+            cooldown = max(1, int(self.limit))  # cut once per round of in-flight requests
+        elif slow:
+            cooldown = self.window
+        else:
+            cooldown = 0
+
+        if cooldown:
+            if self._since_decrease >= cooldown:
+                self.limit = max(self.min_limit, self.limit * self.backoff_ratio)
+                self._since_decrease = 0
+                for latencies in self._latencies.values():
+                    latencies.clear()
+        elif self.in_flight >= int(self.limit):
+            # only grow while the current limit is actually being used
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    @asynccontextmanager
+    async def slot(self, route: str | None = None) -> AsyncIterator[Slot]:
+        """Hold a slot for one request; ``route`` groups its latency with comparable requests"""
+        cond = self._condition()
+        async with cond:
+            await cond.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+        slot = Slot()
+        started = time.monotonic()
+        try:
+            yield slot
+        except Exception:
+            slot.overloaded = True
+            raise
+        finally:
+            self._record(time.monotonic() - started, slot.overloaded, route)
+            async with cond:
+                self.in_flight -= 1
+                cond.notify_all()
@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import json
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from .tag_logic import DEFAULT_CAT, normalize_tag
+
+try:  # orjson decodes large sidecars several times faster; fall back to the stdlib
+    import orjson
+
+    _loads: Callable[[bytes], Any] = orjson.loads
+except ImportError:  # pragma: no cover - depends on the environment
+    _loads = json.loads
+
+metadata_suffixes = ['.json', '.info.json']
+
+# A field maps either to one tag category, or (for dict-valued fields such as
+# e621's ``tags``) to a sub-key -> category mapping. Dotted names reach into
+# nested objects, e.g. ``user.account``.
+FieldMap = dict[str, str | dict[str, str]]
+
+DEFAULT_FIELDS: FieldMap = {'tags': DEFAULT_CAT, 'keywords': DEFAULT_CAT}
+
+_BOORU_FIELDS: FieldMap = {
+    'tags_artist': 'creator',
+    'tags_character': 'character',
+    'tags_copyright': 'series',
+    'tags_metadata': 'meta',
+    'tags_meta': 'meta',
+    'tags_general': DEFAULT_CAT,
+}
+
+EXTRACTOR_FIELDS: dict[str, FieldMap] = {
+    'danbooru': {
+        'tag_string_artist': 'creator',
+        'tag_string_character': 'character',
+        'tag_string_copyright': 'series',
+        'tag_string_meta': 'meta',
+        'tag_string_general': DEFAULT_CAT,
+    },
+    'e621': {
+        'tags': {
+            'artist': 'creator',
+            'character': 'character',
+            'copyright': 'series',
+            'meta': 'meta',
+            'general': DEFAULT_CAT,
+            'species': DEFAULT_CAT,
+            'lore': DEFAULT_CAT,
+        },
+    },
+    'gelbooru': _BOORU_FIELDS,
+    'konachan': _BOORU_FIELDS,
+    'yandere': _BOORU_FIELDS,
+    'pixiv': {'tags': DEFAULT_CAT, 'user.account': 'creator'},
+    'twitter': {'hashtags': DEFAULT_CAT, 'author.name': 'creator'},
+    'deviantart': {'tags': DEFAULT_CAT, 'author.username': 'creator'},
+}
+
+SOURCE_FIELDS = ('source', 'webpage_url', 'url', 'original_url', 'extractor_url')
+
+_RATINGS = {
+    's': 'safe', 'safe': 'safe', 'g': 'safe', 'general': 'safe',
+    'q': 'sketchy', 'questionable': 'sketchy', 'sensitive': 'sketchy',
+    'e': 'unsafe', 'explicit': 'unsafe',
+}
+
+
+@dataclass
+class MediaMetadata:
+    """Everything the importer needs from a file's gallery-dl sidecars."""
+    tags: dict[str, set[str]] = field(default_factory=dict)
+    source: str | None = None
+    safety: str | None = None
+    extractor: str | None = None
+
+    def add_tag(self, category: str, raw: Any) -> None:
+        tag = normalize_tag(str(raw))
+        if tag:
+            self.tags.setdefault(category, set()).add(tag)
+
+    def raw_tags(self) -> list[str]:
+        """Tags in ``category:name`` form, as understood by ``tags_for_upload``"""
+        out = set()
+        for category, tags in self.tags.items():
+            for tag in tags:
+                out.add(tag if category == DEFAULT_CAT else f"{category}:{tag}")
+        return sorted(out)
+
+
+def _lookup(data: dict[str, Any], path: str) -> Any:
+    value: Any = data
+    for part in path.split('.'):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def _iter_tag_values(value: Any):
+    if isinstance(value, str):
+        # booru "tag strings" are space separated
+        yield from value.split()
+    elif isinstance(value, list):
+        for item in value:
+            if isinstance(item, dict):
+                item = item.get('name') or item.get('tag_name')
+            if item:
+                yield item
+
+
+def _safety(data: dict[str, Any]) -> str | None:
+    rating = data.get('rating')
+    if isinstance(rating, str) and rating.lower() in _RATINGS:
+        return _RATINGS[rating.lower()]
+    if isinstance(data.get('x_restrict'), int):
+        return 'unsafe' if data['x_restrict'] else 'safe'
+    if data.get('sensitive') is True:
+        return 'sketchy'
+    return None
+
+
+def _apply(meta: MediaMetadata, data: dict[str, Any]) -> None:
+    extractor = data.get('category') if isinstance(data.get('category'), str) else None
+    meta.extractor = meta.extractor or extractor
+    fields = {**DEFAULT_FIELDS, **EXTRACTOR_FIELDS.get(extractor or '', {})}
+    for name, category in fields.items():
+        value = _lookup(data, name)
+        if isinstance(category, dict):
+            if isinstance(value, dict):
+                for key, sub_category in category.items():
+                    for tag in _iter_tag_values(value.get(key)):
+                        meta.add_tag(sub_category, tag)
+        elif name in DEFAULT_FIELDS and not isinstance(value, list):
+            continue  # generic tags/keywords fields are only trusted as lists
+        else:
+            for tag in _iter_tag_values(value):
+                meta.add_tag(category, tag)
+
+    if meta.source is None:
+        for key in SOURCE_FIELDS:
+            val = data.get(key)
+            if val and isinstance(val, str) and val.startswith('http'):
+                meta.source = val
+                break
+
+    if meta.safety is None:
+        meta.safety = _safety(data)
+
+
+def read_metadata(media_path: Path) -> MediaMetadata:
+    """Parse each of a media file's sidecars exactly once into a MediaMetadata.
+
+    Pure and blocking, so big galleries can run it in a thread pool.
+    """
+    meta = MediaMetadata()
+    for suf in metadata_suffixes:
+        mp = media_path.with_name(media_path.name + suf)
+        try:
+            data = _loads(mp.read_bytes())
+        except (OSError, ValueError):
+            continue
+        if isinstance(data, dict):
+            _apply(meta, data)
+    return meta
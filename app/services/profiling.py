@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import cProfile
+import functools
+import json
+import time
+import uuid
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Iterator
+from contextlib import contextmanager
+from contextvars import Context, ContextVar
+from pathlib import Path
+from typing import Any, TypeVar
+
+from app.core.config import settings
+
+T = TypeVar('T')
+
+MAX_RECENT_RUNS = 50
+
+_current: ContextVar[RunTimer | None] = ContextVar('run_timer', default=None)
+_recent: OrderedDict[str, dict[str, Any]] = OrderedDict()
+
+
+def _percentile(ordered: list[float], q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+class RunTimer:
+    """Per-phase timing spans for one tag-tools or import run."""
+
+    def __init__(self, kind: str, run_id: str | None = None):
+        self.kind = kind
+        self.run_id = run_id or uuid.uuid4().hex
+        self.started = time.time()
+        self._t0 = time.perf_counter()
+        self.spans: dict[str, list[float]] = {}
+
+    def record(self, name: str, seconds: float) -> None:
+        self.spans.setdefault(name, []).append(seconds)
+
+    def summary(self) -> dict[str, Any]:
+        spans = {}
+        for name, durations in sorted(self.spans.items()):
+            ordered = sorted(durations)
+            spans[name] = {
+                'count': len(ordered),
+                'total': round(sum(ordered), 4),
+                'p50': round(_percentile(ordered, 0.50), 4),
+                'p95': round(_percentile(ordered, 0.95), 4),
+                'max': round(ordered[-1], 4),
+            }
+        return {
+            'run_id': self.run_id,
+            'kind': self.kind,
+            'started': self.started,
+            'wall': round(time.perf_counter() - self._t0, 4),
+            'spans': spans,
+        }
+
+
+def current_timer(context: Context | None = None) -> RunTimer | None:
+    """The current run's timer, or the one set inside ``context`` (e.g. another task's)"""
+    return context.get(_current) if context is not None else _current.get()
+
+
+def record(name: str, seconds: float) -> None:
+    """Add an already measured duration to the current run, if there is one"""
+    timer = _current.get()
+    if timer is not None:
+        timer.record(name, seconds)
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Time a block against the current run, if there is one"""
+    timer = _current.get()
+    if timer is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer.record(name, time.perf_counter() - started)
+
+
+def timed(name: str) -> Callable[[Callable[..., Awaitable[T]]], Callable[..., Awaitable[T]]]:
+    """Decorate an async function so each call is recorded as a ``name`` span"""
+    def decorator(fn: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+        @functools.wraps(fn)
+        async def wrapper(*args: Any, **kwargs: Any) -> T:
+            with span(name):
+                return await fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def runs_dir() -> Path:
+    return settings.state_dir / 'runs'
+
+
+@contextmanager
+def run_timer(kind: str, profile: bool = False, run_id: str | None = None) -> Iterator[RunTimer]:
+    """Make a new RunTimer current for the enclosed run and keep its summary afterwards.
+
+    Tasks started inside the block inherit the timer through contextvars. With
+    ``profile`` a cProfile of the process is written to ``runs/<id>.prof``;
+    because asyncio interleaves coroutines it covers everything running at the
+    time, not just this run.
+    """
+    timer = RunTimer(kind, run_id)
+    token = _current.set(timer)
+    profiler = cProfile.Profile() if profile else None
+    if profiler:
+        profiler.enable()
+    try:
+        yield timer
+    finally:
+        if profiler:
+            profiler.disable()
+            runs_dir().mkdir(parents=True, exist_ok=True)
+            profiler.dump_stats(str(runs_dir() / f'{timer.run_id}.prof'))
+        save_summary(timer.summary())
+        try:
+            _current.reset(token)
+        except ValueError:
+            # an async generator finalised from another context; nothing to restore
+            pass
+
+
+def save_summary(summary: dict[str, Any]) -> None:
+    _recent[summary['run_id']] = summary
+    while len(_recent) > MAX_RECENT_RUNS:
+        _recent.popitem(last=False)
+    try:
+        runs_dir().mkdir(parents=True, exist_ok=True)
+        (runs_dir() / f"{summary['run_id']}.json").write_text(json.dumps(summary))
+    except OSError:
+        pass
+
+
+def get_summary(run_id: str) -> dict[str, Any] | None:
+    if run_id in _recent:
+        return _recent[run_id]
+    path = runs_dir() / f'{run_id}.json'
+    if path.is_file() and path.parent == runs_dir():
+        return json.loads(path.read_text())
+    return None
+
+
+def recent_summaries() -> list[dict[str, Any]]:
+    return list(reversed(_recent.values()))
+
+
+def profile_path(run_id: str) -> Path | None:
+    path = runs_dir() / f'{run_id}.prof'
+    return path if path.is_file() and path.parent == runs_dir() else None
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import json
+import time
+import uuid
+from collections.abc import AsyncIterator
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Self, TextIO
+
+from app.core.config import settings
+
+
+def reports_dir() -> Path:
+    return settings.state_dir / 'reports'
+
+
+def report_path(report_id: str) -> Path | None:
+    path = reports_dir() / f'{report_id}.ndjson'
+    return path if path.parent == reports_dir() and path.is_file() else None
+
+
+def prune_reports(max_age: float | None = None) -> None:
+    """Remove reports older than ``max_age`` (default ``SZURU_REPORT_TTL``)"""
+    if not reports_dir().is_dir():
+        return
+    cutoff = time.time() - (settings.report_ttl if max_age is None else max_age)
+    for path in reports_dir().glob('*.ndjson'):
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+        except OSError:
+            pass
+
+
+class ReportWriter:
+    """Append-only NDJSON log of every event of a tag-tools run.
+
+    Lines go through a buffered file, so memory stays flat however long the
+    run is; the report can be downloaded while it is still being written.
+    """
+
+    def __init__(self, report_id: str | None = None):
+        prune_reports()
+        self.id = report_id or uuid.uuid4().hex
+        reports_dir().mkdir(parents=True, exist_ok=True)
+        self.path = reports_dir() / f'{self.id}.ndjson'
+        # Held for the writer's lifetime and closed by close()
+        self._file: TextIO | None = open(self.path, 'a', encoding='utf-8')  # noqa: SIM115
+        self.lines = 0
+
+    def write(self, event: dict[str, Any]) -> None:
+        if self._file is not None:
+            self._file.write(json.dumps({'ts': round(time.time(), 3), **event}) + '\n')
+            self.lines += 1
+
+    def flush(self) -> None:
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+@dataclass
+class ReportSummary:
+    """What a non-streaming caller gets back: the complete event and a bounded sample of messages"""
+    report_id: str
+    complete: dict[str, Any] = field(default_factory=dict)
+    details: list[str] = field(default_factory=list)
+    omitted: int = 0
+
+
+async def sample_details(events: AsyncIterator[dict[str, Any]], summary: ReportSummary,
+                         *, sample: int | None = None) -> AsyncIterator[dict[str, Any]]:
+    """Pass a run's events through, filling ``summary`` with its complete event and a bounded sample"""
+    sample = settings.report_details_sample if sample is None else sample
+    async for event in events:
+        if event['type'] == 'complete':
+            summary.complete = event
+        elif event.get('message'):
+            if len(summary.details) < sample:
+                summary.details.append(event['message'])
+            else:
+                summary.omitted += 1
+        yield event
+
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+from collections.abc import AsyncIterator
+from typing import Any
+
+from app.core.config import settings
+
+from .reports import ReportWriter
+
+# Events that shape the run and are always forwarded; everything else is a
+# per-item line that is counted and sampled
+STRUCTURAL_TYPES = frozenset({'status', 'summary', 'complete'})
+QUEUE_SIZE = 1000
+
+_DONE = object()
+
+
+class _Batch:
+    def __init__(self, sample: int):
+        self.sample = sample
+        self.events: list[dict[str, Any]] = []
+        self.counts: dict[str, int] = {}
+        self.progress: dict[str, Any] | None = None
+        self.omitted = 0
+        self._kept: dict[str, int] = {}
+
+    def __bool__(self) -> bool:
+        return bool(self.events or self.counts or self.progress)
+
+    def add(self, event: dict[str, Any]) -> None:
+        kind = event.get('type', 'info')
+        self.counts[kind] = self.counts.get(kind, 0) + 1
+        if kind == 'progress':
+            self.progress = event
+            return
+        # errors get their own allowance so a burst of successes can't hide them
+        bucket = 'error' if kind == 'error' else 'detail'
+        if kind in STRUCTURAL_TYPES or self._kept.get(bucket, 0) < self.sample:
+            if kind not in STRUCTURAL_TYPES:
+                self._kept[bucket] = self._kept.get(bucket, 0) + 1
+            self.events.append(event)
+        else:
+            self.omitted += 1
+
+
+async def coalesce(
+    events: AsyncIterator[dict[str, Any]],
+    report: ReportWriter,
+    *,
+    interval: float | None = None,
+    sample: int | None = None,
+    context: contextvars.Context | None = None,
+) -> AsyncIterator[dict[str, Any]]:
+    """Group a run's events into one ``batch`` event per ``interval`` seconds.
+
+    A batch carries the structural events in order, at most ``sample``
+    per-item lines (plus as many errors), the latest progress event, and
+    per-type counts for the batch and the run so far. Every event is written
+    to ``report`` in full. The run is driven by its own task (in ``context``
+    when given) so batches go out on time even while it waits on Szurubooru.
+    """
+    interval = settings.stream_batch_interval if interval is None else interval
+    sample = settings.stream_batch_sample if sample is None else sample
+    queue: asyncio.Queue[Any] = asyncio.Queue(maxsize=QUEUE_SIZE)
+
+    async def pump() -> None:
+        try:
+            async for event in events:
+                await queue.put(event)
+        except Exception as e:
+            await queue.put({'type': 'error', 'message': f'Unexpected error: {e}'})
+        await queue.put(_DONE)
+
+    loop = asyncio.get_running_loop()
+    task = asyncio.create_task(pump(), context=context)
+    totals: dict[str, int] = {}
+    batch = _Batch(sample)
+
+    def flush() -> dict[str, Any]:
+        nonlocal batch
+        for kind, count in batch.counts.items():
+            totals[kind] = totals.get(kind, 0) + count
+        out = {'type': 'batch', 'report_id': report.id, 'events': batch.events, 'progress': batch.progress,
+               'counts': batch.counts, 'totals': dict(totals), 'omitted': batch.omitted}
+        report.flush()
+        batch = _Batch(sample)
+        return out
+
+    deadline = loop.time() + interval
+    try:
+        while True:
+            try:
+                item = await asyncio.wait_for(queue.get(), timeout=max(0.0, deadline - loop.time()))
+            except TimeoutError:
+                item = None
+            if item is _DONE:
+                break
+            if item is not None:
+                report.write(item)
+                batch.add(item)
+            if loop.time() >= deadline:
+                if batch:
+                    yield flush()
+                deadline = loop.time() + interval
+        if batch:
+            yield flush()
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
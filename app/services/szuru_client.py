@@ -1,16 +1,99 @@
+import asyncio
 import base64
-import json
-from typing import Any, Dict, Sequence
+import importlib.util
+import logging
+import os
+import random
+import time
+import uuid
+from collections import deque
+from collections.abc import AsyncIterator, Sequence
+from contextvars import ContextVar
+from dataclasses import dataclass
+from itertools import islice
+from typing import Any
+from urllib.parse import urlencode
 
 import httpx
 
 from app.core.config import settings
+from app.core.metrics import (
+    SZURU_CONCURRENCY_LIMIT,
+    SZURU_LATENCY,
+    SZURU_REQUESTS,
+    UPLOAD_BYTES,
+    route_label,
+)
 
-from .tag_logic import normalize_tag
+from .cache import SingleFlight, TTLCache
+from .limiter import AdaptiveLimiter
+from .profiling import span, timed
+from .tag_graph import TagGraph
+
+logger = logging.getLogger(__name__)
+
+# Server-side filters and field projections for the bulk list queries
+IMPLYING_TAGS_QUERY = 'implication-count:1..'
+UNUSED_TAGS_QUERY = 'usages:0'
+TAG_GRAPH_FIELDS = ('names', 'category', 'usages', 'version', 'implications')
+POST_TAG_FIELDS = ('id', 'version', 'tags')
+
+
+@dataclass
+class Page:
+    """One page of a list endpoint: its results, their offset and the reported total"""
+    results: list[dict]
+    offset: int
+    total: int | None
+
+
+class SzuruError(RuntimeError):
+    """Non-2xx response from Szurubooru; keeps the status code for callers that branch on it"""
+
+    def __init__(self, method: str, url: str, status_code: int, body: str = ''):
+        super().__init__(f"Szuru {method} {url} failed {status_code}: {body}")
+        self.status_code = status_code
+
+    @property
+    def is_conflict(self) -> bool:
+        # Szurubooru answers a stale `version` (optimistic locking) with 409
+        return self.status_code == 409
+
+
+# Only requests that are safe to repeat are retried on transient failures
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS'})
+RETRY_STATUSES = frozenset({502, 503, 504})
+# Responses that tell the adaptive limiter to back off
+OVERLOAD_STATUSES = frozenset({429, 503})
+# Routes whose latency follows the payload rather than server load; they only signal overload
+UNTIMED_ROUTES = frozenset({'api/uploads'})
+
+# Set by a background job for everything it runs: while the event is clear
+# (job paused) no new request is sent; requests already in flight finish.
+request_gate: ContextVar[asyncio.Event | None] = ContextVar('request_gate', default=None)
+
+
+def _http2_available() -> bool:
+    return importlib.util.find_spec('h2') is not None
+
+
+async def _read_chunks(path: str, chunk_size: int = 64 * 1024) -> AsyncIterator[bytes]:
+    """Read a file in chunks on a worker thread, so disk reads don't block the event loop"""
+    f = await asyncio.to_thread(open, path, 'rb')
+    try:
+        while chunk := await asyncio.to_thread(f.read, chunk_size):
+            yield chunk
+    finally:
+        await asyncio.to_thread(f.close)
 
 
 class SzuruClient:
-    def __init__(self, base_url: str | None = None, auth_mode: str | None = None):
+    def __init__(
+        self,
+        base_url: str | None = None,
+        auth_mode: str | None = None,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ):
         if base_url:
             self.base_url = base_url.rstrip('/')
         elif settings.base:
@@ -18,9 +101,38 @@ class SzuruClient:
         else:
             raise RuntimeError("SZURU_BASE is required but not configured")
         self.auth_mode = auth_mode or settings.auth_mode
-        self._client = httpx.AsyncClient(base_url=self.base_url)
-
-    def _auth_header(self) -> Dict[str, str]:
+        http2 = settings.http2 and transport is None
+        if http2 and not _http2_available():
+            logger.warning("SZURU_HTTP2 is enabled but the h2 package is missing; using HTTP/1.1")
+            http2 = False
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=settings.max_connections,
+                max_keepalive_connections=settings.max_keepalive_connections,
+                keepalive_expiry=settings.keepalive_expiry,
+            ),
+            timeout=httpx.Timeout(
+                settings.read_timeout,
+                connect=settings.connect_timeout,
+                pool=settings.pool_timeout,
+            ),
+            transport=transport,
+        )
+        self._headers: dict[str, str] | None = None
+        # Shared by every caller of this client, so all bulk paths back off together
+        self.limiter = AdaptiveLimiter(
+            initial=settings.limit_initial,
+            min_limit=settings.limit_min if settings.adaptive_limit else settings.limit_initial,
+            max_limit=settings.limit_max if settings.adaptive_limit else settings.limit_initial,
+            latency_tolerance=settings.limit_latency_tolerance,
+        )
+        # Positive-only cache of tags/categories known to exist, shared by concurrent imports
+        self._exists: TTLCache[tuple[str, str], bool] = TTLCache(settings.exists_cache_size, settings.exists_cache_ttl)
+        self._flights = SingleFlight()
+
+    def _auth_header(self) -> dict[str, str]:
         if self.auth_mode == 'token' or (self.auth_mode == 'auto' and settings.token):
             if not (settings.user and settings.token):
                 raise RuntimeError("Token auth requires SZURU_USER and SZURU_TOKEN")
@@ -32,140 +144,356 @@ class SzuruClient:
         raw = f"{settings.user}:{settings.password}".encode()
         return {"Authorization": f"Basic {base64.b64encode(raw).decode()}"}
 
-    async def _req(self, method: str, path: str, json: Any | None = None, files: Dict[str, Any] | None = None):
-        headers = {"Accept": "application/json", **self._auth_header()}
+    def _request_headers(self) -> dict[str, str]:
+        # Built on first use (credentials may not be configured at import time), then reused
+        if self._headers is None:
+            self._headers = {"Accept": "application/json", **self._auth_header()}
+        return self._headers
+
+    @staticmethod
+    def _backoff(attempt: int) -> float:
+        """Full-jitter exponential backoff delay before retry ``attempt`` (0-based)"""
+        cap = min(settings.retry_backoff_max, settings.retry_backoff * (2 ** attempt))
+        return random.uniform(0, cap)  # jitter, not crypto
+
+    async def _req(self, method: str, path: str, json: Any | None = None,
+                   content: AsyncIterator[bytes] | None = None, headers: dict[str, str] | None = None):
         url = path if path.startswith('http') else f"{self.base_url}/{path.lstrip('/')}"
-        r = await self._client.request(method, url, json=json, files=files, headers=headers)
+        attempts = settings.retries + 1 if method in IDEMPOTENT_METHODS else 1
+        route = route_label(url, self.base_url)
+        limiter_route = None if route in UNTIMED_ROUTES else f'{method} {route}'
+        gate = request_gate.get()
+        for attempt in range(attempts):
+            if gate is not None:
+                await gate.wait()
+            try:
+                async with self.limiter.slot(limiter_route) as slot:
+                    # Timed inside the slot: queueing on the local limiter isn't server latency
+                    started = time.perf_counter()
+                    r = await self._client.request(
+                        method, url, json=json, content=content, headers={**self._request_headers(), **(headers or {})}
+                    )
+                    slot.overloaded = r.status_code in OVERLOAD_STATUSES
+            except httpx.TransportError as e:
+                self._observe(method, route, 'error', started)
+                if attempt + 1 >= attempts:
+                    raise
+                logger.warning("retrying %s %s after %s (attempt %d)", method, route, type(e).__name__, attempt + 1)
+            else:
+                self._observe(method, route, str(r.status_code), started)
+                if r.status_code not in RETRY_STATUSES or attempt + 1 >= attempts:
+                    break
+                logger.warning("retrying %s %s after HTTP %d (attempt %d)", method, route, r.status_code, attempt + 1)
+            await asyncio.sleep(self._backoff(attempt))
         if r.status_code >= 400:
-            raise RuntimeError(f"Szuru {method} {url} failed {r.status_code}: {r.text[:400]}")
+            raise SzuruError(method, url, r.status_code, r.text[:400])
         if 'application/json' in r.headers.get('content-type',''):
             return r.json()
         return r.text
 
+    def _observe(self, method: str, route: str, status: str, started: float) -> None:
+        SZURU_REQUESTS.labels(method, route, status).inc()
+        SZURU_LATENCY.labels(method, route, status).observe(time.perf_counter() - started)
+        SZURU_CONCURRENCY_LIMIT.set(self.limiter.limit)
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
     async def ensure_category(self, name: str, color: str = '#808080', order: int = 0):
+        key = ('category', name)
+        if self._exists.get(key):
+            return 'exists'
+        return await self._flights.do(key, lambda: self._ensure_category(name, color, order))
+
+    async def _ensure_category(self, name: str, color: str, order: int) -> str:
         try:
             await self._req('GET', f'api/tag-category/{name}')
-            return
-        except Exception:
-            pass
-        await self._req('POST', 'api/tag-categories', json={"name": name, "color": color, "order": order})
-
+            status = 'exists'
+        except SzuruError as e:
+            if e.status_code != 404:
+                raise
+            await self._req('POST', 'api/tag-categories', json={"name": name, "color": color, "order": order})
+            status = 'created'
+        self._exists.set(('category', name), True)
+        return status
+
+    @timed('ensure_tag')
     async def ensure_tag(self, tag: str, category: str):
-        try:
-            await self._req('GET', f'api/tag/{tag}')
+        key = ('tag', tag)
+        if self._exists.get(key):
             return 'exists'
-        except Exception:
-            pass
-        await self._req('POST', 'api/tags', json={"names": [tag], "category": category})
-        return 'created'
+        return await self._flights.do(key, lambda: self._ensure_tag(tag, category))
 
-    async def upload_post(self, file_path: str, tags: Sequence[str], safety: str = 'safe', source: str | None = None) -> dict:
-        metadata: Dict[str, Any] = {"tags": list(tags), "safety": safety}
+    async def _ensure_tag(self, tag: str, category: str) -> str:
+        try:
+            await self._req('GET', f'api/tag/{tag}')
+            status = 'exists'
+        except SzuruError as e:
+            if e.status_code != 404:
+                raise
+            await self._req('POST', 'api/tags', json={"names": [tag], "category": category})
+            status = 'created'
+        self._exists.set(('tag', tag), True)
+        return status
+
+    async def upload_file(self, file_path: str) -> str:
+        """Stream a media file to ``api/uploads`` and return its content token.
+
+        The multipart body is built here so the file is read in fixed-size
+        chunks off the event loop: memory use doesn't grow with the size of
+        the file, and a slow disk doesn't hold up other requests.
+        """
+        boundary = uuid.uuid4().hex
+        filename = os.path.basename(file_path).replace('"', '%22')
+        head = (f'--{boundary}\r\nContent-Disposition: form-data; name="content"; filename="{filename}"\r\n'
+                'Content-Type: application/octet-stream\r\n\r\n').encode()
+        tail = f'\r\n--{boundary}--\r\n'.encode()
+        size = await asyncio.to_thread(os.path.getsize, file_path)
+
+        async def body() -> AsyncIterator[bytes]:
+            yield head
+            async for chunk in _read_chunks(file_path):
+                yield chunk
+            yield tail
+
+        data = await self._req('POST', 'api/uploads', content=body(), headers={
+            'Content-Type': f'multipart/form-data; boundary={boundary}',
+            'Content-Length': str(len(head) + size + len(tail)),
+        })
+        UPLOAD_BYTES.inc(size)
+        return data['token']
+
+    async def create_post(self, content_token: str, tags: Sequence[str], safety: str = 'safe', source: str | None = None) -> dict:
+        """Create a post from previously uploaded content"""
+        metadata: dict[str, Any] = {"tags": list(tags), "safety": safety, "contentToken": content_token}
         if source:
             metadata['source'] = source
+        return await self._req('POST', 'api/posts/', json=metadata)
 
-        with open(file_path, 'rb') as f:
-            files = {
-                'metadata': (None, json.dumps(metadata), 'application/json'),
-                'content': (file_path.split('/')[-1], f.read(), 'application/octet-stream')
-            }
-            return await self._req('POST', 'api/posts/', files=files)
-
-    async def get_implications(self, tag: str) -> list[str]:
-        # naive: list implications by querying tag endpoint details if available
-        data = await self._req('GET', f'api/tag/{tag}')
-        # placeholder path; adjust to actual field names when known
-        imps = []
-        for rel in data.get('implications', []) or []:
-            name = rel.get('names', [None])[0]
-            if name:
-                normalized = normalize_tag(name)
-                if normalized:  # Only append if normalize_tag returns a non-None value
-                    imps.append(normalized)
-        return imps
-
-    async def search_posts(self, query: str, limit: int = 100, offset: int = 0) -> dict:
+    @timed('upload_post')
+    async def upload_post(self, file_path: str, tags: Sequence[str], safety: str = 'safe', source: str | None = None) -> dict:
+        token = await self.upload_file(file_path)
+        # Server-side failures only retry the metadata call; the content token is reused
+        attempt = 0
+        while True:
+            try:
+                return await self.create_post(token, tags, safety=safety, source=source)
+            except SzuruError as e:
+                if e.status_code < 500 or attempt >= settings.upload_retries:
+                    raise
+                logger.warning("retrying post creation after HTTP %d (attempt %d)", e.status_code, attempt + 1)
+            await asyncio.sleep(self._backoff(attempt))
+            attempt += 1
+
+    @timed('search_posts')
+    async def search_posts(
+        self, query: str, limit: int = 100, offset: int = 0, fields: Sequence[str] | None = None
+    ) -> dict:
         """Search for posts using Szurubooru query syntax"""
-        params = {'query': query, 'limit': limit, 'offset': offset}
-        url = f"api/posts/?{'&'.join(f'{k}={v}' for k, v in params.items())}"
+        params: dict[str, Any] = {'query': query, 'limit': limit, 'offset': offset}
+        if fields:
+            params['fields'] = ','.join(fields)
+        url = f"api/posts/?{urlencode(params)}"
         return await self._req('GET', url)
 
+    @timed('get_post')
     async def get_post(self, post_id: int) -> dict:
         """Get a single post by ID"""
         return await self._req('GET', f'api/post/{post_id}')
 
+    async def update_post_source(self, post_id: int, source: str, version: int) -> dict:
+        """Replace a post's source field (newline-separated URLs)"""
+        return await self._req('PUT', f'api/post/{post_id}', json={'source': source, 'version': version})
+
+    async def add_post_source(self, post_id: int, url: str) -> bool:
+        """Append ``url`` to a post's sources unless already present; returns True if it changed"""
+        post = await self.get_post(post_id)
+        sources = [s for s in (post.get('source') or '').splitlines() if s.strip()]
+        if url in sources:
+            return False
+        await self.update_post_source(post_id, '\n'.join(sources + [url]), post['version'])
+        return True
+
+    @timed('update_post_tags')
     async def update_post_tags(self, post_id: int, tags: list[str], version: int) -> dict:
         """Update tags for a post - requires current version for optimistic locking"""
         return await self._req('PUT', f'api/post/{post_id}', json={'tags': tags, 'version': version})
 
-    async def get_all_tags_with_implications(self) -> list[str]:
-        """Get all tags that have implications defined"""
-        tags_with_implications = []
-        offset = 0
-        limit = 100  # Maximum allowed by Szurubooru
+    async def iter_pages(
+        self,
+        path: str,
+        query: str = '',
+        limit: int = 100,
+        fields: Sequence[str] | None = None,
+    ) -> AsyncIterator[Page]:
+        """Page through a Szurubooru list endpoint (``api/tags/``, ``api/posts/``).
+
+        ``query`` is passed through as Szurubooru search syntax so filtering
+        happens server-side, and ``fields`` limits each resource to the named
+        attributes so large scans don't download and decode unused data.
+
+        Once the first response reports ``total``, the next ``page_prefetch``
+        pages are requested concurrently while the caller works on the current
+        one, so page latency overlaps with processing and at most a few pages
+        are held in memory. Without ``total`` it falls back to sequential paging.
+        """
+        async def fetch(offset: int) -> dict:
+            params: dict[str, Any] = {'limit': limit, 'offset': offset}
+            if query:
+                params['query'] = query
+            if fields:
+                params['fields'] = ','.join(fields)
+            with span(phase):
+                return await self._req('GET', f"{path}?{urlencode(params)}")
+
+        phase = 'list_tags' if path.startswith('api/tags') else 'search_posts'
+
+        first = await fetch(0)
+        results = first.get('results', [])
+        total = first.get('total')
+        if not results:
+            return
+        yield Page(results, 0, total)
+
+        if total is None:
+            offset = 0
+            while len(results) >= limit:
+                offset += limit
+                results = (await fetch(offset)).get('results', [])
+                if not results:
+                    break
+                yield Page(results, offset, None)
+            return
 
-        print("DEBUG: Starting pagination to get all tags with implications...")
+        offsets = iter(range(limit, total, limit))
+        pending: deque[tuple[int, asyncio.Task]] = deque()
+        try:
+            for offset in islice(offsets, max(1, settings.page_prefetch)):
+                pending.append((offset, asyncio.create_task(fetch(offset))))
+            while pending:
+                offset, task = pending.popleft()
+                data = await task
+                nxt = next(offsets, None)
+                if nxt is not None:
+                    pending.append((nxt, asyncio.create_task(fetch(nxt))))
+                results = data.get('results', [])
+                if not results:
+                    break
+                yield Page(results, offset, data.get('total', total))
+        finally:
+            for _, task in pending:
+                task.cancel()
+
+    async def iter_posts_by_id(
+        self,
+        query: str = '',
+        after: int = 0,
+        limit: int = 100,
+        fields: Sequence[str] | None = None,
+    ) -> AsyncIterator[Page]:
+        """Page through the posts matching ``query`` with an id above ``after``, in id order.
+
+        Pages are addressed by id range (keyset) rather than by offset, so each
+        request costs the server the same however deep the walk is, and posts
+        deleted along the way can't shift later pages past unread posts.
+
+        Without a filter, ids are dense: a probe for the highest id splits the
+        rest into windows of ``limit`` ids (``id:N..M``, never more than one
+        page each), and the next ``page_prefetch`` windows are requested while
+        the caller works on the current one. Filtered walks continue
+        sequentially from the last id seen. A page's ``offset`` is the number
+        of posts yielded before it and ``total`` the count above ``after``.
+        """
+        if fields and 'id' not in fields:
+            fields = (*fields, 'id')
+
+        async def fetch(ids: str, order: str = 'asc', count: int = limit) -> dict:
+            params: dict[str, Any] = {'limit': count, 'offset': 0,
+                                      'query': ' '.join(filter(None, (query, f'id:{ids}', f'sort:id,{order}')))}
+            if fields:
+                params['fields'] = ','.join(fields)
+            with span('search_posts'):
+                return await self._req('GET', f"api/posts/?{urlencode(params)}")
+
+        yielded = 0
+        total: int | None = None
+        if not query:
+            probe = await fetch(f'{after + 1}..', 'desc', 1)
+            if not probe.get('results'):
+                return
+            total = probe.get('total')
+            last_id = probe['results'][0]['id']
+            windows = iter(range(after + 1, last_id + 1, limit))
+            pending: deque[asyncio.Task] = deque()
+            try:
+                for low in islice(windows, max(1, settings.page_prefetch)):
+                    pending.append(asyncio.create_task(fetch(f'{low}..{low + limit - 1}')))
+                while pending:
+                    data = await pending.popleft()
+                    nxt = next(windows, None)
+                    if nxt is not None:
+                        pending.append(asyncio.create_task(fetch(f'{nxt}..{nxt + limit - 1}')))
+                    results = data.get('results', [])
+                    if results:  # ids freed by deleted posts leave some windows empty
+                        yield Page(results, yielded, total)
+                        yielded += len(results)
+            finally:
+                for task in pending:
+                    task.cancel()
+            after = last_id  # then pick up posts created during the walk
 
         while True:
-            print(f"DEBUG: Requesting tags offset={offset}, limit={limit}")
-            data = await self._req('GET', f'api/tags/?limit={limit}&offset={offset}')
+            data = await fetch(f'{after + 1}..')
             results = data.get('results', [])
-            print(f"DEBUG: Got {len(results)} tags in this batch")
-
             if not results:
-                break
-
-            for tag_data in results:
-                tag_names = tag_data.get('names', [])
-                implications = tag_data.get('implications', [])
-
-                if implications:  # Only check if implications exist
-                    print(f"DEBUG: Tag {tag_names[0] if tag_names else 'unknown'} has {len(implications)} implications")
-
-                if tag_names and implications:
-                    # Use the primary name (first in names array)
-                    primary_name = tag_names[0]
-                    normalized = normalize_tag(primary_name)
-                    if normalized:  # Only append if normalize_tag returns a non-None value
-                        tags_with_implications.append(normalized)
-
-            # Check if we got fewer results than the limit, meaning we're done
+                return
+            total = data.get('total') if total is None else max(total, yielded + len(results))
+            yield Page(results, yielded, total)
+            yielded += len(results)
             if len(results) < limit:
-                break
-
-            offset += limit
-
-        print(f"DEBUG: Found {len(tags_with_implications)} tags with implications: {tags_with_implications}")
-        return tags_with_implications
+                return
+            after = results[-1]['id']
+
+    async def iter_tags(self, query: str = '', fields: Sequence[str] | None = None) -> AsyncIterator[dict]:
+        """Iterate tag resources matching ``query``"""
+        async for page in self.iter_pages('api/tags/', query, fields=fields):
+            for tag_data in page.results:
+                yield tag_data
+
+    async def iter_posts(self, query: str = '', fields: Sequence[str] | None = None) -> AsyncIterator[dict]:
+        """Iterate post resources matching ``query``"""
+        async for page in self.iter_pages('api/posts/', query, fields=fields):
+            for post in page.results:
+                yield post
+
+    async def get_tag_graph(self, query: str = '') -> TagGraph:
+        """Snapshot tags (names, category, usages, implications) in one paginated sweep
+
+        Pass ``query`` to narrow the sweep server-side, e.g. ``IMPLYING_TAGS_QUERY``.
+        """
+        graph = TagGraph()
+        logger.debug("building tag graph query=%r", query)
+        async for tag_data in self.iter_tags(query, fields=TAG_GRAPH_FIELDS):
+            graph.add_resource(tag_data)
+        logger.debug("tag graph built tags=%d", len(graph))
+        return graph
 
     async def get_unused_tags(self) -> list[dict]:
         """Get all tags with 0 usages"""
-        unused_tags = []
-        offset = 0
-        limit = 100  # Maximum allowed by Szurubooru
-
-        while True:
-            data = await self._req('GET', f'api/tags/?limit={limit}&offset={offset}')
-            results = data.get('results', [])
-
-            if not results:
-                break
-
-            for tag_data in results:
-                usage_count = tag_data.get('usages', 0)
-                if usage_count == 0:
-                    unused_tags.append(tag_data)
-
-            # Check if we got fewer results than the limit, meaning we're done
-            if len(results) < limit:
-                break
-
-            offset += limit
+        # Filtered server-side; the usages check only guards against stale counts
+        tags = self.iter_tags(UNUSED_TAGS_QUERY, fields=('names', 'version', 'usages'))
+        return [tag_data async for tag_data in tags if tag_data.get('usages', 0) == 0]
 
-        return unused_tags
+    @timed('get_tag')
+    async def get_tag(self, tag: str) -> dict:
+        """Get a single tag by name"""
+        return await self._req('GET', f'api/tag/{tag}')
 
+    @timed('delete_tag')
     async def delete_tag(self, tag: str, version: int) -> dict:
         """Delete a tag - requires current version for optimistic locking"""
-        return await self._req('DELETE', f'api/tag/{tag}', json={'version': version})
+        result = await self._req('DELETE', f'api/tag/{tag}', json={'version': version})
+        self._exists.discard(('tag', tag))
+        return result
 
 szuru_client = SzuruClient()
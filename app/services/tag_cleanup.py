@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+from collections.abc import AsyncIterator
+from typing import Any
+
+from app.core.config import settings
+from app.core.metrics import TAGS_DELETED
+
+from .profiling import run_timer
+from .szuru_client import SzuruClient, SzuruError
+from .workers import WorkerPool
+
+
+async def _delete_tag(client: SzuruClient, tag_data: dict[str, Any], counters: dict[str, int]) -> dict[str, Any]:
+    """Delete one unused tag, refetching and retrying on version conflicts."""
+    name = tag_data['names'][0]
+    version = tag_data.get('version')
+    for attempt in range(settings.conflict_retries + 1):
+        try:
+            await client.delete_tag(name, version)
+            break
+        except SzuruError as e:
+            if not e.is_conflict or attempt == settings.conflict_retries:
+                return {'type': 'error', 'tag': name, 'message': f'Failed to delete tag {name}: {e}'}
+        except Exception as e:
+            return {'type': 'error', 'tag': name, 'message': f'Failed to delete tag {name}: {e}'}
+        # The tag changed since it was listed; only retry if it is still unused
+        try:
+            fresh = await client.get_tag(name)
+        except Exception as e:
+            return {'type': 'error', 'tag': name, 'message': f'Failed to refetch tag {name} after conflict: {e}'}
+        if fresh.get('usages', 0):
+            return {'type': 'info', 'tag': name, 'message': f'Skipped tag {name}: now used by {fresh["usages"]} posts'}
+        version = fresh.get('version')
+
+    counters['tags_deleted'] += 1
+    TAGS_DELETED.inc()
+    return {'type': 'success', 'tag': name, 'message': f'Deleted tag: {name}'}
+
+
+async def delete_unused_tags(
+    client: SzuruClient, *, dry_run: bool = False, profile: bool = False
+) -> AsyncIterator[dict[str, Any]]:
+    """Delete every tag with 0 usages, yielding progress events as it goes."""
+    counters = {'tags_found': 0, 'tags_deleted': 0}
+
+    with run_timer('delete_unused_tags', profile) as timer:
+        yield {'type': 'status', 'message': 'Finding tags with 0 usages...'}
+
+        # Get all unused tags
+        try:
+            unused_tags = await client.get_unused_tags()
+            counters['tags_found'] = len(unused_tags)
+            yield {'type': 'status', 'message': f"Found {counters['tags_found']} unused tags"}
+        except Exception as e:
+            yield {'type': 'error', 'message': f'Error getting unused tags: {e}'}
+            return
+
+        if not unused_tags:
+            yield {'type': 'info', 'message': 'No unused tags found'}
+            yield {'type': 'complete', 'data': counters, 'message': 'COMPLETE - No tags to delete',
+                   'run_id': timer.run_id, 'timings': timer.summary()}
+            return
+
+        pool: WorkerPool[dict[str, Any]] = WorkerPool(settings.update_concurrency)
+        try:
+            # Process each unused tag
+            for tag_index, tag_data in enumerate(unused_tags):
+                tag_names = tag_data.get('names', [])
+                if not tag_names:
+                    continue
+
+                primary_name = tag_names[0]
+                yield {'type': 'progress', 'current': tag_index + 1, 'total': counters['tags_found'], 'tag': primary_name,
+                       'limit': client.limiter.snapshot()['limit']}
+
+                if dry_run:
+                    counters['tags_deleted'] += 1
+                    yield {'type': 'info', 'tag': primary_name, 'message': f'Would delete tag: {primary_name}'}
+                    continue
+
+                await pool.submit(_delete_tag(client, tag_data, counters))
+                for event in pool.completed():
+                    yield event
+
+            async for event in pool.drain():
+                yield event
+        finally:
+            await pool.close()
+
+        if dry_run:
+            final_message = f"DRY RUN COMPLETE - Would delete {counters['tags_deleted']} tags"
+        else:
+            final_message = f"DELETION COMPLETE - Deleted {counters['tags_deleted']} tags"
+        yield {'type': 'complete', 'data': counters, 'message': final_message,
+               'run_id': timer.run_id, 'timings': timer.summary()}
@@ -0,0 +1,268 @@
+from __future__ import annotations
+
+import hashlib
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from typing import Any
+
+from .tag_logic import normalize_tag
+
+
+@dataclass
+class TagInfo:
+    name: str
+    aliases: list[str] = field(default_factory=list)
+    category: str | None = None
+    usages: int = 0
+    version: int | None = None
+    implications: list[str] = field(default_factory=list)
+
+
+def _primary_name(resource: dict[str, Any]) -> str | None:
+    names = resource.get('names') or []
+    return normalize_tag(names[0]) if names else None
+
+
+class TagGraph:
+    """Snapshot of every tag and its direct implications.
+
+    Built from a single sweep of ``api/tags/`` so a run can answer implication
+    lookups in memory instead of issuing one ``GET api/tag/{name}`` per tag.
+    """
+
+    def __init__(self, tags: Iterable[TagInfo] = ()):
+        self._tags: dict[str, TagInfo] = {}
+        self._aliases: dict[str, str] = {}
+        for info in tags:
+            self.add(info)
+
+    @classmethod
+    def from_resources(cls, resources: Iterable[dict[str, Any]]) -> TagGraph:
+        graph = cls()
+        for resource in resources:
+            graph.add_resource(resource)
+        return graph
+
+    def add(self, info: TagInfo) -> None:
+        self._tags[info.name] = info
+        self._aliases[info.name] = info.name
+        for alias in info.aliases:
+            self._aliases.setdefault(alias, info.name)
+
+    def add_resource(self, resource: dict[str, Any]) -> None:
+        name = _primary_name(resource)
+        if not name:
+            return
+        aliases = [a for a in (normalize_tag(n) for n in resource.get('names', [])[1:]) if a]
+        implications = []
+        for rel in resource.get('implications', []) or []:
+            imp = _primary_name(rel)
+            if imp and imp not in implications:
+                implications.append(imp)
+        category = resource.get('category')
+        if isinstance(category, dict):
+            category = category.get('name')
+        self.add(TagInfo(
+            name=name,
+            aliases=aliases,
+            category=category,
+            usages=resource.get('usages', 0) or 0,
+            version=resource.get('version'),
+            implications=implications,
+        ))
+
+    def resolve(self, tag: str) -> str | None:
+        """Return the primary name for ``tag`` (which may be an alias)."""
+        normalized = normalize_tag(tag)
+        if not normalized:
+            return None
+        return self._aliases.get(normalized)
+
+    def get(self, tag: str) -> TagInfo | None:
+        name = self.resolve(tag)
+        return self._tags.get(name) if name else None
+
+    def implications(self, tag: str) -> list[str]:
+        info = self.get(tag)
+        return list(info.implications) if info else []
+
+    def tags_with_implications(self) -> list[str]:
+        return [name for name, info in self._tags.items() if info.implications]
+
+    async def get_implications(self, tag: str) -> list[str]:
+        """Async lookup so the snapshot can stand in for an ImplicationProvider."""
+        return self.implications(tag)
+
+    def __contains__(self, tag: object) -> bool:
+        return isinstance(tag, str) and self.resolve(tag) is not None
+
+    def __len__(self) -> int:
+        return len(self._tags)
+
+
+class ImplicationResolver:
+    """Transitive closure over a TagGraph's implication edges.
+
+    Closures are computed once per strongly connected component (Tarjan), so
+    implication cycles such as ``a -> b -> a`` terminate and are reported via
+    ``cycles`` instead of recursing forever.
+
+    Every tag that implies or is implied is interned to a small integer id,
+    and each closure is kept as a bitset (a Python int with bit ``id`` set),
+    so checking a post is a handful of ORs and one AND NOT, with tags that
+    take no part in any implication dropped by a single dict lookup.
+    """
+
+    def __init__(self, graph: TagGraph):
+        self.graph = graph
+        self._cycles: list[list[str]] = []
+        self._ids: dict[str, int] = {}
+        self._names: list[str] = []
+        self._closure: dict[int, int] | None = None
+        self._lookup: dict[str, int | None] = {}
+
+    @property
+    def cycles(self) -> list[list[str]]:
+        """Implication cycles found in the graph, each as a sorted list of tags."""
+        self._ensure()
+        return self._cycles
+
+    def _ensure(self) -> dict[int, int]:
+        if self._closure is None:
+            self._closure = self._compute()
+        return self._closure
+
+    def _intern(self, name: str) -> int:
+        tag_id = self._ids.get(name)
+        if tag_id is None:
+            tag_id = self._ids[name] = len(self._names)
+            self._names.append(name)
+        return tag_id
+
+    def _id(self, tag: str) -> int | None:
+        """Interned id of ``tag`` (name or alias, in any spelling), None if no implication involves it"""
+        try:
+            return self._lookup[tag]
+        except KeyError:
+            pass
+        normalized = normalize_tag(tag)
+        name = (self.graph.resolve(normalized) or normalized) if normalized else None
+        tag_id = self._lookup[tag] = self._ids.get(name) if name else None
+        return tag_id
+
+    def _decode(self, bits: int) -> list[str]:
+        names = []
+        while bits:
+            low = bits & -bits
+            names.append(self._names[low.bit_length() - 1])
+            bits ^= low
+        return names
+
+    def _successors(self, tag: str) -> list[str]:
+        return [self.graph.resolve(imp) or imp for imp in self.graph.implications(tag)]
+
+    def _compute(self) -> dict[int, int]:
+        closure: dict[str, int] = {}
+        index: dict[str, int] = {}
+        low: dict[str, int] = {}
+        stack: list[str] = []
+        on_stack: set[str] = set()
+        counter = 0
+
+        for root in self.graph.tags_with_implications():
+            if root in index:
+                continue
+            index[root] = low[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack.add(root)
+            work = [(root, iter(self._successors(root)))]
+            while work:
+                node, successors = work[-1]
+                for nxt in successors:
+                    if nxt not in index:
+                        index[nxt] = low[nxt] = counter
+                        counter += 1
+                        stack.append(nxt)
+                        on_stack.add(nxt)
+                        work.append((nxt, iter(self._successors(nxt))))
+                        break
+                    if nxt in on_stack:
+                        low[node] = min(low[node], index[nxt])
+                else:
+                    work.pop()
+                    if work:
+                        parent = work[-1][0]
+                        low[parent] = min(low[parent], low[node])
+                    if low[node] != index[node]:
+                        continue
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    # Successor components were emitted first, so their closures are final
+                    members = set(component)
+                    reach = 0
+                    for member in component:
+                        for succ in self._successors(member):
+                            reach |= 1 << self._intern(succ)
+                            if succ not in members:
+                                reach |= closure.get(succ, 0)
+                    if len(component) > 1 or reach >> self._intern(node) & 1:
+                        self._cycles.append(sorted(component))
+                    for member in component:
+                        closure[member] = reach & ~(1 << self._intern(member))
+        return {self._ids[tag]: bits for tag, bits in closure.items()}
+
+    def closure(self, tag: str) -> frozenset[str]:
+        """All tags implied by ``tag``, directly or transitively (excluding itself)."""
+        closures = self._ensure()
+        tag_id = self._id(tag)
+        return frozenset(self._decode(closures.get(tag_id, 0))) if tag_id is not None else frozenset()
+
+    def digests(self) -> dict[str, str]:
+        """Short digest of each implying tag's closure, for spotting implication changes between runs"""
+        return {
+            self._names[tag_id]: hashlib.sha1(','.join(sorted(self._decode(bits))).encode()).hexdigest()[:12]
+            for tag_id, bits in self._ensure().items()
+            if bits
+        }
+
+    def missing(self, current_tags: Iterable[str], roots: Iterable[str] | None = None) -> list[str]:
+        """Implied tags absent from ``current_tags``.
+
+        When ``roots`` is given only implications of those tags are considered,
+        otherwise every tag on the post contributes its closure.
+        """
+        return self.missing_many([current_tags], roots)[0]
+
+    def missing_many(
+        self, posts_tags: Iterable[Iterable[str]], roots: Iterable[str] | None = None
+    ) -> list[list[str]]:
+        """``missing`` for a batch of posts (e.g. one page), sharing the lookups and ``roots`` mask"""
+        closures = self._ensure()
+        lookup = self._id
+        allowed = -1  # every bit
+        if roots is not None:
+            allowed = 0
+            for root in roots:
+                root_id = lookup(root)
+                if root_id is not None:
+                    allowed |= 1 << root_id
+        out = []
+        for tags in posts_tags:
+            current = needed = 0
+            for tag in tags:
+                tag_id = lookup(tag)
+                if tag_id is None:
+                    continue
+                bit = 1 << tag_id
+                current |= bit
+                if allowed & bit:
+                    needed |= closures.get(tag_id, 0)
+            missing = needed & ~current
+            out.append(sorted(self._decode(missing)) if missing else [])
+        return out
@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import json
+import time
+import uuid
+from collections import deque
+from collections.abc import AsyncIterator, Callable
+from typing import Any
+
+from app.core.config import settings
+from app.core.metrics import ACTIVE_JOBS
+
+from .profiling import current_timer
+from .reports import ReportWriter
+from .streaming import coalesce
+from .szuru_client import request_gate
+
+MAX_FINISHED_JOBS = 50
+ACTIVE_STATUSES = frozenset({'running', 'paused'})
+# Batches buffered for one subscriber; one that falls further behind is disconnected
+SUBSCRIBER_QUEUE_SIZE = 100
+_LAGGED: dict[str, Any] = {'type': 'lagged', 'message': 'Fell too far behind the job; reconnect to replay recent events'}
+
+
+class JobConflict(RuntimeError):
+    """A job of the same kind is already running"""
+
+    def __init__(self, job: TagJob):
+        super().__init__(f"A {job.kind} job is already {job.status}: {job.id}")
+        self.job = job
+
+
+class TagJob:
+    """One tag-maintenance run in the background, detached from any HTTP connection.
+
+    Its events are coalesced into batches (as for the streaming endpoints),
+    kept in a short replay buffer and fanned out to every subscriber.
+    """
+
+    def __init__(self, kind: str, params: dict[str, Any]):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.params = params
+        self.status = 'running'
+        self.created = time.time()
+        self.finished: float | None = None
+        self.run_id: str | None = None
+        self.report_id: str | None = None
+        self.totals: dict[str, int] = {}
+        self.progress: dict[str, Any] | None = None
+        self.result: dict[str, Any] | None = None
+        self.gate = asyncio.Event()
+        self.gate.set()
+        self.history: deque[dict[str, Any]] = deque(maxlen=settings.job_replay_batches)
+        self._subscribers: set[asyncio.Queue[dict[str, Any] | None]] = set()
+        self.task: asyncio.Task | None = None
+        self._context: contextvars.Context | None = None
+
+    @property
+    def active(self) -> bool:
+        return self.status in ACTIVE_STATUSES
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'params': self.params,
+            'status': self.status,
+            'created': self.created,
+            'finished': self.finished,
+            'run_id': self.run_id,
+            'report_id': self.report_id,
+            'totals': self.totals,
+            'progress': self.progress,
+            'result': self.result,
+            'subscribers': len(self._subscribers),
+        }
+
+    def frame(self, item: dict[str, Any]) -> str:
+        """One server-sent event, its serialization timed against the run while it is going"""
+        started = time.perf_counter()
+        chunk = f"data: {json.dumps(item)}\n\n"
+        timer = current_timer(self._context) if self._context is not None else None
+        if timer is not None:
+            timer.record('serialize_events', time.perf_counter() - started)
+        return chunk
+
+    def publish(self, batch: dict[str, Any]) -> None:
+        self.history.append(batch)
+        for queue in list(self._subscribers):
+            self._send(queue, batch)
+
+    def _send(self, queue: asyncio.Queue[dict[str, Any] | None], item: dict[str, Any] | None) -> None:
+        try:
+            queue.put_nowait(item)
+        except asyncio.QueueFull:
+            # A slow client mustn't hold the job's batches in memory; it can reconnect and replay
+            self._subscribers.discard(queue)
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(_LAGGED)
+
+    def _record(self, batch: dict[str, Any]) -> None:
+        self.totals = batch['totals']
+        self.progress = batch['progress'] or self.progress
+        for event in batch['events']:
+            if event['type'] == 'complete':
+                self.result = event.get('data')
+        self.publish(batch)
+
+    async def _track(self, events: AsyncIterator[dict[str, Any]]) -> AsyncIterator[dict[str, Any]]:
+        # The run id comes with the run's first event, before any batch is flushed
+        async for event in events:
+            self.run_id = self.run_id or event.get('run_id')
+            yield event
+
+    def _set_status(self, status: str, message: str) -> None:
+        self.status = status
+        if not self.active:
+            self.finished = time.time()
+        self.publish({'type': 'job', 'job_id': self.id, 'status': status, 'message': message})
+
+    async def subscribe(self) -> AsyncIterator[dict[str, Any]]:
+        """Recent batches, then live ones until the job ends"""
+        queue: asyncio.Queue[dict[str, Any] | None] = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        replay = list(self.history)
+        live_too = self.active
+        if live_too:
+            # Anything published while the replay is read waits in the queue, up to its bound
+            self._subscribers.add(queue)
+        try:
+            for item in replay:
+                yield item
+            while live_too:
+                live = await queue.get()
+                if live is None:
+                    return
+                yield live
+                if live is _LAGGED:
+                    return
+        finally:
+            self._subscribers.discard(queue)
+
+    def _close_subscribers(self) -> None:
+        for queue in list(self._subscribers):
+            self._send(queue, None)
+
+    async def run(self, events: AsyncIterator[dict[str, Any]]) -> None:
+        # Everything this job runs, including tasks it starts, waits on this gate before each request
+        request_gate.set(self.gate)
+        ACTIVE_JOBS.labels(self.kind).inc()
+        try:
+            with ReportWriter() as report:
+                self.report_id = report.id
+                # The run's timer is set inside this context, where frame() can find it
+                self._context = contextvars.copy_context()
+                async for batch in coalesce(self._track(events), report, context=self._context):
+                    self._record(batch)
+            self._set_status('done', f'{self.kind} finished')
+        except asyncio.CancelledError:
+            self._set_status('cancelled', f'{self.kind} cancelled')
+            raise
+        except Exception as e:
+            self._set_status('failed', f'{self.kind} failed: {e}')
+        finally:
+            ACTIVE_JOBS.labels(self.kind).dec()
+            self._close_subscribers()
+
+    def pause(self) -> None:
+        if self.status == 'running':
+            self.gate.clear()
+            self._set_status('paused', f'{self.kind} paused; requests already sent will finish')
+
+    def resume(self) -> None:
+        if self.status == 'paused':
+            self.gate.set()
+            self._set_status('running', f'{self.kind} resumed')
+
+    async def wait(self) -> None:
+        # asyncio.wait, unlike awaiting the task, leaves the job running if the waiter is cancelled
+        if self.task is not None:
+            await asyncio.wait({self.task})
+
+    async def cancel(self) -> None:
+        if self.task is not None and self.active:
+            self.gate.set()  # let a paused job unwind
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+
+
+class TagJobManager:
+    """Starts tag-maintenance jobs, at most one active job per kind."""
+
+    def __init__(self) -> None:
+        self._jobs: dict[str, TagJob] = {}
+
+    def start(
+        self, kind: str, params: dict[str, Any], run: Callable[[], AsyncIterator[dict[str, Any]]]
+    ) -> TagJob:
+        for job in self._jobs.values():
+            if job.kind == kind and job.active:
+                raise JobConflict(job)
+        job = TagJob(kind, params)
+        job.task = asyncio.create_task(job.run(run()))
+        self._jobs[job.id] = job
+        self._prune()
+        return job
+
+    def _prune(self) -> None:
+        finished = [job for job in self._jobs.values() if not job.active]
+        for job in finished[:-MAX_FINISHED_JOBS] if len(finished) > MAX_FINISHED_JOBS else []:
+            del self._jobs[job.id]
+
+    def get(self, job_id: str) -> TagJob | None:
+        return self._jobs.get(job_id)
+
+    def list_jobs(self, active: bool = False) -> list[TagJob]:
+        jobs = sorted(self._jobs.values(), key=lambda j: j.created, reverse=True)
+        return [job for job in jobs if job.active] if active else jobs
+
+    async def stop(self) -> None:
+        """Cancel running jobs; apply-implications runs keep their checkpoints for a resume"""
+        await asyncio.gather(*(job.cancel() for job in self._jobs.values() if job.active))
+
+
+_manager: TagJobManager | None = None
+
+
+def get_tag_jobs() -> TagJobManager:
+    global _manager
+    if _manager is None:
+        _manager = TagJobManager()
+    return _manager
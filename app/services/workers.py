@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterator, Awaitable
+from typing import Generic, TypeVar
+
+T = TypeVar('T')
+
+
+class WorkerPool(Generic[T]):
+    """Run awaitables with a bounded number in flight and hand back results as they finish.
+
+    ``submit`` waits for a free slot, which applies backpressure to whatever is
+    producing work (e.g. a paginated scan). Producers interleave ``completed()``
+    to pick up finished results and call ``drain()`` once they run out of work.
+    """
+
+    def __init__(self, concurrency: int):
+        self._slots = asyncio.Semaphore(max(1, concurrency))
+        self._tasks: set[asyncio.Task[T]] = set()
+        self._results: list[T] = []
+        self._error: BaseException | None = None
+
+    async def submit(self, job: Awaitable[T]) -> None:
+        try:
+            await self._slots.acquire()
+        except asyncio.CancelledError:
+            if asyncio.iscoroutine(job):
+                job.close()  # cancelled while waiting for a slot; it never started
+            raise
+        task = asyncio.ensure_future(job)
+        self._tasks.add(task)
+        task.add_done_callback(self._finished)
+
+    def _finished(self, task: asyncio.Task[T]) -> None:
+        self._tasks.discard(task)
+        self._slots.release()
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            self._error = self._error or task.exception()
+        else:
+            self._results.append(task.result())
+
+    def completed(self) -> list[T]:
+        """Results that finished since the last call, without waiting.
+
+        Re-raises the first exception a job raised; jobs are expected to turn
+        their own failures into results.
+        """
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+        results, self._results = self._results, []
+        return results
+
+    async def drain(self) -> AsyncIterator[T]:
+        """Wait for every in-flight job, yielding results as they come in."""
+        while self._tasks or self._results or self._error:
+            for result in self.completed():
+                yield result
+            if self._tasks:
+                await asyncio.wait(set(self._tasks), return_when=asyncio.FIRST_COMPLETED)
+
+    async def close(self) -> None:
+        """Cancel anything still in flight (e.g. when the consumer goes away)."""
+        for task in list(self._tasks):
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
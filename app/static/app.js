@@ -33,6 +33,17 @@ class ApiClient {
     });
   }
 
+  static async queueImports(urls, safety = 'safe', attachSource = false) {
+    return this.request('/import/jobs', {
+      method: 'POST',
+      body: JSON.stringify({ urls, safety, attach_source: attachSource })
+    });
+  }
+
+  static async getImportJob(jobId) {
+    return this.request(`/import/jobs/${jobId}`);
+  }
+
   static async applyImplications(tags, dryRun = false, fullScan = false) {
     return this.request('/tag-tools/apply-implications', {
       method: 'POST',
@@ -92,6 +103,130 @@ class UI {
   }
 }
 
+// Bounded, virtualized log: only the rows in view are in the DOM, and only
+// the newest maxEntries lines are kept, so long runs stay responsive.
+class LogView {
+  static COLORS = {
+    info: '#666',
+    success: '#28a745',
+    error: '#dc3545',
+    warning: '#ffc107',
+    status: '#007bff',
+    progress: '#6f42c1',
+    summary: '#17a2b8'
+  };
+
+  constructor(container, { maxEntries = 5000, rowHeight = 20 } = {}) {
+    this.container = container;
+    this.maxEntries = maxEntries;
+    this.rowHeight = rowHeight;
+    this.entries = [];
+    this.dropped = 0;
+    this.spacer = document.createElement('div');
+    this.rows = document.createElement('div');
+    this.rows.style.cssText = 'position: absolute; left: 10px; right: 10px; top: 0;';
+    container.appendChild(this.spacer);
+    container.appendChild(this.rows);
+    this.scheduled = false;
+    container.addEventListener('scroll', () => this.schedule());
+  }
+
+  add(message, type = 'info') {
+    this.entries.push({ time: new Date().toLocaleTimeString(), message, type });
+    if (this.entries.length > this.maxEntries) {
+      const excess = this.entries.length - this.maxEntries;
+      this.entries.splice(0, excess);
+      this.dropped += excess;
+    }
+    this.schedule();
+  }
+
+  schedule() {
+    if (!this.scheduled) {
+      this.scheduled = true;
+      requestAnimationFrame(() => this.render());
+    }
+  }
+
+  render() {
+    this.scheduled = false;
+    const el = this.container;
+    const atBottom = el.scrollTop + el.clientHeight >= el.scrollHeight - this.rowHeight * 2;
+    const rows = this.entries.length + (this.dropped ? 1 : 0);
+    this.spacer.style.height = `${rows * this.rowHeight}px`;
+    if (atBottom) {
+      el.scrollTop = el.scrollHeight;
+    }
+    const first = Math.max(0, Math.floor(el.scrollTop / this.rowHeight) - 5);
+    const last = Math.min(rows, Math.ceil((el.scrollTop + el.clientHeight) / this.rowHeight) + 5);
+    this.rows.style.top = `${first * this.rowHeight}px`;
+    this.rows.replaceChildren();
+    for (let i = first; i < last; i++) {
+      const row = document.createElement('div');
+      row.className = 'log-row';
+      const index = this.dropped ? i - 1 : i;
+      if (index < 0) {
+        row.textContent = `… ${this.dropped} earlier lines not shown (see the full log)`;
+        row.style.color = '#999';
+      } else {
+        const entry = this.entries[index];
+        const time = document.createElement('span');
+        time.style.color = '#999';
+        time.textContent = `[${entry.time}] `;
+        const text = document.createElement('span');
+        text.style.color = LogView.COLORS[entry.type] || LogView.COLORS.info;
+        text.textContent = entry.message;
+        row.title = entry.message;
+        row.append(time, text);
+      }
+      this.rows.appendChild(row);
+    }
+  }
+}
+
+// Follow a background job's event stream (replayed batches first, then live ones)
+// and call onEvent for every event it carries. The server coalesces events into
+// `batch` messages; their latest progress event comes first, then the batch's
+// events, then a note of omitted lines.
+async function followEvents(url, onEvent) {
+  await readEvents(await fetch(url), onEvent);
+}
+
+async function readEvents(response, onEvent) {
+  if (!response.ok) {
+    throw new Error(`HTTP error! status: ${response.status}`);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    // SSE messages end with a blank line; keep any partial message for the next read
+    const messages = buffer.split('\n\n');
+    buffer = messages.pop();
+    for (const message of messages) {
+      if (!message.startsWith('data: ')) continue;
+      const data = JSON.parse(message.slice(6));
+      if (data.type !== 'batch') {
+        onEvent(data);
+        continue;
+      }
+      if (data.progress) {
+        onEvent({ ...data.progress, report_id: data.report_id });
+      }
+      for (const event of data.events) {
+        onEvent({ ...event, report_id: data.report_id });
+      }
+      if (data.omitted) {
+        onEvent({ type: 'omitted', count: data.omitted, totals: data.totals, report_id: data.report_id });
+      }
+    }
+  }
+}
+
 // Set active nav link
 function setActiveNav() {
   const path = window.location.pathname;
@@ -0,0 +1,309 @@
+"""In-process fake Szurubooru for benchmarks.
+
+Serves the subset of the API the app uses (tag and post listing with
+server-side queries and ``fields`` projection, single post/tag reads and
+writes with optimistic locking, uploads) from generated in-memory data.
+Plug it into a client with ``SzuruClient(transport=fake.transport())``.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import random
+import re
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass
+from datetime import UTC, date, datetime
+from typing import Any
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import httpx
+
+from app.core.metrics import route_label
+
+_TAG_PATH = re.compile(r'^api/tag/(?P<name>[^/]+)$')
+_POST_PATH = re.compile(r'^api/post/(?P<id>\d+)$')
+_CATEGORY_PATH = re.compile(r'^api/tag-category/(?P<name>[^/]+)$')
+
+
+@dataclass
+class Dataset:
+    """Shape of the generated corpus.
+
+    The first ``chain_fraction`` of tags form implication chains of
+    ``chain_length`` (``t0 -> t1 -> t2``, ``t3 -> t4 -> t5``, ...); posts that
+    use a chain head get it without its implied tags ``implied_missing`` of the
+    time. The last ``unused_fraction`` of tags are never put on a post.
+    """
+    posts: int = 10_000
+    tags: int = 2_000
+    tags_per_post: int = 6
+    chain_length: int = 3
+    chain_fraction: float = 0.2
+    unused_fraction: float = 0.1
+    implied_missing: float = 0.5
+    seed: int = 0
+
+
+@dataclass
+class Faults:
+    """Injected server behaviour: per-request latency (plus uniform jitter) and 503 rate"""
+    latency: float = 0.0
+    jitter: float = 0.0
+    error_rate: float = 0.0
+
+
+class FakeSzurubooru:
+    def __init__(self, dataset: Dataset | None = None, faults: Faults | None = None):
+        self.dataset = dataset or Dataset()
+        self.faults = faults or Faults()
+        self.requests: Counter[str] = Counter()
+        self.injected_errors = 0
+        self._rng = random.Random(self.dataset.seed)
+        self.tags: dict[str, dict[str, Any]] = {}
+        self.posts: dict[int, dict[str, Any]] = {}
+        self.categories = {'default'}
+        self._next_post_id = 1
+        self._generate()
+
+    # -- data ----------------------------------------------------------
+
+    def _generate(self) -> None:
+        ds = self.dataset
+        rng = random.Random(ds.seed)
+        names = [f't{i:06d}' for i in range(ds.tags)]
+        chained = int(ds.tags * ds.chain_fraction) // ds.chain_length * ds.chain_length
+        for i, name in enumerate(names):
+            implications = []
+            if i < chained and i % ds.chain_length != ds.chain_length - 1:
+                implications = [names[i + 1]]
+            self.tags[name] = {'name': name, 'category': 'default', 'version': 1, 'implications': implications,
+                               'posts': set()}
+        used = names[:max(1, int(ds.tags * (1 - ds.unused_fraction)))]
+        heads = [names[i] for i in range(0, chained, ds.chain_length)]
+        for _ in range(ds.posts):
+            tags = set(rng.sample(used, min(ds.tags_per_post, len(used))))
+            if heads and rng.random() < 0.5:
+                head = rng.choice(heads)
+                tags.add(head)
+                if rng.random() >= ds.implied_missing:
+                    tags |= self.closure(head)
+            self._add_post(tags)
+
+    def _add_post(self, tags: set[str], **extra: Any) -> dict[str, Any]:
+        post = {'id': self._next_post_id, 'version': 1, 'tags': set(), 'source': None,
+                'checksum': uuid.uuid4().hex, 'last_edit': None, **extra}
+        self._next_post_id += 1
+        self.posts[post['id']] = post
+        self._set_tags(post, tags)
+        return post
+
+    def _set_tags(self, post: dict[str, Any], tags: set[str]) -> None:
+        for name in post['tags'] - tags:
+            self.tags[name]['posts'].discard(post['id'])
+        for name in tags - post['tags']:
+            if name not in self.tags:  # Szurubooru creates unknown tags on the fly
+                self.tags[name] = {'name': name, 'category': 'default', 'version': 1, 'implications': [],
+                                   'posts': set()}
+            self.tags[name]['posts'].add(post['id'])
+        post['tags'] = set(tags)
+
+    def edit_post(self, post_id: int, tags: set[str]) -> None:
+        """Change a post's tags as another user would"""
+        post = self.posts[post_id]
+        self._set_tags(post, tags)
+        post['version'] += 1
+        post['last_edit'] = time.time()
+
+    def add_implication(self, tag: str, implied: str) -> None:
+        self.tags.setdefault(implied, {'name': implied, 'category': 'default', 'version': 1, 'implications': [],
+                                       'posts': set()})
+        self.tags[tag]['implications'].append(implied)
+        self.tags[tag]['version'] += 1
+
+    def closure(self, tag: str) -> set[str]:
+        out: set[str] = set()
+        stack = list(self.tags[tag]['implications'])
+        while stack:
+            name = stack.pop()
+            if name not in out:
+                out.add(name)
+                stack.extend(self.tags.get(name, {}).get('implications', []))
+        return out
+
+    def posts_missing_implications(self) -> int:
+        """Posts a full apply-implications run should update"""
+        count = 0
+        for post in self.posts.values():
+            needed: set[str] = set()
+            for tag in post['tags']:
+                needed |= self.closure(tag)
+            count += bool(needed - post['tags'])
+        return count
+
+    # -- resources -----------------------------------------------------
+
+    def _tag_resource(self, tag: dict[str, Any]) -> dict[str, Any]:
+        return {
+            'names': [tag['name']],
+            'category': tag['category'],
+            'version': tag['version'],
+            'usages': len(tag['posts']),
+            'implications': [{'names': [name], 'category': 'default'} for name in tag['implications']],
+            'suggestions': [],
+        }
+
+    def _post_resource(self, post: dict[str, Any]) -> dict[str, Any]:
+        return {
+            'id': post['id'],
+            'version': post['version'],
+            'checksum': post['checksum'],
+            'source': post['source'],
+            'lastEditTime': (datetime.fromtimestamp(post['last_edit'], UTC).isoformat()
+                             if post['last_edit'] else None),
+            'tags': [{'names': [name], 'category': 'default'} for name in sorted(post['tags'])],
+        }
+
+    @staticmethod
+    def _project(resource: dict[str, Any], fields: str | None) -> dict[str, Any]:
+        if not fields:
+            return resource
+        keep = fields.split(',')
+        return {k: v for k, v in resource.items() if k in keep}
+
+    # -- queries -------------------------------------------------------
+
+    def _list_tags(self, query: str) -> list[dict[str, Any]]:
+        tags = list(self.tags.values())
+        for token in query.split():
+            if token == 'implication-count:1..':
+                tags = [t for t in tags if t['implications']]
+            elif token.startswith('usages:'):
+                usages = int(token.split(':', 1)[1])
+                tags = [t for t in tags if len(t['posts']) == usages]
+        return tags
+
+    def _list_posts(self, query: str) -> list[int]:
+        ids: list[int] | None = None
+        ascending = False
+        min_id = 0
+        max_id: int | None = None
+        edited_since: date | None = None
+        for token in query.split():
+            if token == 'sort:id,asc':
+                ascending = True
+            elif token.startswith('tag:'):
+                tag = self.tags.get(token[4:])
+                ids = sorted(tag['posts']) if tag else []
+            elif token.startswith('id:') and '..' in token:
+                low, high = token[3:].split('..')
+                min_id = int(low)
+                max_id = int(high) if high else None
+            elif token.startswith('last-edit-date:') and token.endswith('..'):
+                edited_since = date.fromisoformat(token[len('last-edit-date:'):-2])
+        if ids is None:
+            ids = list(self.posts)  # insertion order is id order
+        if min_id or max_id is not None:
+            ids = [i for i in ids if i >= min_id and (max_id is None or i <= max_id)]
+        if edited_since:
+            ids = [i for i in ids if self.posts[i]['last_edit']
+                   and datetime.fromtimestamp(self.posts[i]['last_edit'], UTC).date() >= edited_since]
+        if not ascending:
+            ids.reverse()
+        return ids
+
+    # -- transport -----------------------------------------------------
+
+    def transport(self) -> httpx.MockTransport:
+        return httpx.MockTransport(self.handle)
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests[f'{request.method} {route_label(str(request.url))}'] += 1
+        faults = self.faults
+        if faults.latency or faults.jitter:
+            await asyncio.sleep(faults.latency + self._rng.random() * faults.jitter)
+        if faults.error_rate and self._rng.random() < faults.error_rate:
+            self.injected_errors += 1
+            return httpx.Response(503, json={'name': 'ServiceUnavailable', 'description': 'injected'})
+        body = await request.aread()
+        try:
+            return self._route(request, body)
+        except KeyError:
+            return httpx.Response(404, json={'name': 'NotFoundError', 'description': 'not found'})
+
+    def _route(self, request: httpx.Request, body: bytes) -> httpx.Response:
+        url = urlsplit(str(request.url))
+        path = unquote(url.path).strip('/')
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        method = request.method
+        data = json.loads(body) if body and request.headers.get('content-type') == 'application/json' else {}
+
+        if path in ('api/tags', 'api/posts') and method == 'GET':
+            if path == 'api/tags':
+                tags = self._list_tags(params.get('query', ''))
+                items = [self._tag_resource(t) for t in self._page(tags, params)]
+                total = len(tags)
+            else:
+                ids = self._list_posts(params.get('query', ''))
+                items = [self._post_resource(self.posts[i]) for i in self._page(ids, params)]
+                total = len(ids)
+            results = [self._project(item, params.get('fields')) for item in items]
+            return httpx.Response(200, json={'query': params.get('query', ''), 'offset': int(params.get('offset', 0)),
+                                             'limit': int(params.get('limit', 100)), 'total': total,
+                                             'results': results})
+
+        if match := _POST_PATH.match(path):
+            post = self.posts[int(match['id'])]
+            if method == 'PUT':
+                if data.get('version') != post['version']:
+                    return httpx.Response(409, json={'name': 'IntegrityError', 'description': 'version mismatch'})
+                if 'tags' in data:
+                    self._set_tags(post, set(data['tags']))
+                if 'source' in data:
+                    post['source'] = data['source']
+                post['version'] += 1
+                post['last_edit'] = time.time()
+            return httpx.Response(200, json=self._post_resource(post))
+
+        if match := _TAG_PATH.match(path):
+            tag = self.tags[match['name']]
+            if method == 'DELETE':
+                if data.get('version') != tag['version']:
+                    return httpx.Response(409, json={'name': 'IntegrityError', 'description': 'version mismatch'})
+                for post_id in tag['posts']:
+                    self.posts[post_id]['tags'].discard(tag['name'])
+                del self.tags[tag['name']]
+                return httpx.Response(200, json={})
+            return httpx.Response(200, json=self._tag_resource(tag))
+
+        if path == 'api/tags' and method == 'POST':
+            name = data['names'][0]
+            self.tags.setdefault(name, {'name': name, 'category': data.get('category', 'default'), 'version': 1,
+                                        'implications': [], 'posts': set()})
+            return httpx.Response(200, json=self._tag_resource(self.tags[name]))
+
+        if match := _CATEGORY_PATH.match(path):
+            if match['name'] not in self.categories:
+                raise KeyError(match['name'])
+            return httpx.Response(200, json={'name': match['name'], 'version': 1})
+
+        if path == 'api/tag-categories' and method == 'POST':
+            self.categories.add(data['name'])
+            return httpx.Response(200, json={'name': data['name'], 'version': 1})
+
+        if path == 'api/uploads' and method == 'POST':
+            return httpx.Response(200, json={'token': uuid.uuid4().hex})
+
+        if path == 'api/posts' and method == 'POST':
+            post = self._add_post(set(data.get('tags', [])))
+            post['source'] = data.get('source')
+            return httpx.Response(200, json=self._post_resource(post))
+
+        return httpx.Response(404, json={'name': 'NotFoundError', 'description': f'no route for {method} {path}'})
+
+    @staticmethod
+    def _page(items: list[Any], params: dict[str, str]) -> list[Any]:
+        offset = int(params.get('offset', 0))
+        return items[offset:offset + int(params.get('limit', 100))]
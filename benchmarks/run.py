@@ -0,0 +1,199 @@
+"""Benchmark the bulk paths against the in-process fake Szurubooru.
+
+    python -m benchmarks.run --posts 100000 --tags 20000 --latency 0.005
+    python -m benchmarks.run --scenario full-scan --json results.json
+    python -m benchmarks.run --baseline results.json --tolerance 0.2
+
+Every scenario gets a freshly generated server, so the numbers don't depend
+on the order they run in. With ``--baseline`` the exit status is 1 if any
+scenario's throughput dropped by more than ``--tolerance``.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import stat
+import sys
+import tempfile
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable
+from pathlib import Path
+from typing import Any
+
+os.environ.setdefault('SZURU_BASE', 'http://fake.szuru')
+os.environ.setdefault('SZURU_USER', 'bench')
+os.environ.setdefault('SZURU_TOKEN', 'bench')
+
+from app.core.config import settings
+from app.services import downloader
+from app.services.implications import apply_implications
+from app.services.importer import import_url
+from app.services.szuru_client import SzuruClient
+from app.services.tag_cleanup import delete_unused_tags
+from app.services.tag_graph import ImplicationResolver, TagGraph
+
+from .fake_szuru import Dataset, FakeSzurubooru, Faults
+
+FAKE_GALLERY_DL = '''#!{python}
+# mimic gallery-dl in pipe output mode: write file + sidecar, print the path
+import json, os, sys
+dest = sys.argv[sys.argv.index('-D') + 1]
+for i in range({files}):
+    path = os.path.join(dest, f'file{{i:05d}}.jpg')
+    with open(path, 'wb') as f:
+        f.write(os.urandom({size}))
+    with open(path + '.json', 'w') as f:
+        json.dump({{'category': 'danbooru', 'tag_string_general': f'bench_{{i % 50}} shared',
+                   'tag_string_artist': f'artist_{{i % 5}}', 'rating': 's'}}, f)
+    print(path, flush=True)
+'''
+
+
+async def _consume(events: AsyncIterator[dict[str, Any]]) -> dict[str, Any]:
+    complete: dict[str, Any] = {}
+    async for event in events:
+        if event['type'] == 'complete':
+            complete = event
+    return complete
+
+
+async def bench_direct(client: SzuruClient, fake: FakeSzurubooru, args: argparse.Namespace) -> tuple[int, dict]:
+    heads = [name for name, tag in fake.tags.items() if tag['implications']][::args.chain_length]
+    complete = await _consume(apply_implications(client, heads[:args.direct_tags]))
+    return complete['data']['posts_found'], complete.get('timings', {})
+
+
+async def bench_full_scan(client: SzuruClient, fake: FakeSzurubooru, args: argparse.Namespace) -> tuple[int, dict]:
+    complete = await _consume(apply_implications(client, [], full_scan=True))
+    return complete['data']['posts_found'], complete.get('timings', {})
+
+
+async def bench_delete_unused(client: SzuruClient, fake: FakeSzurubooru, args: argparse.Namespace) -> tuple[int, dict]:
+    complete = await _consume(delete_unused_tags(client))
+    return complete['data']['tags_deleted'], complete.get('timings', {})
+
+
+async def bench_import(client: SzuruClient, fake: FakeSzurubooru, args: argparse.Namespace) -> tuple[int, dict]:
+    result = await import_url(client, 'https://example.com/bench')
+    return result.uploaded, result.timings
+
+
+async def bench_check(client: SzuruClient, fake: FakeSzurubooru, args: argparse.Namespace) -> tuple[int, dict]:
+    """CPU only: check every post against the implication closure, a page at a time, without HTTP"""
+    resolver = ImplicationResolver(TagGraph.from_resources(fake._tag_resource(tag) for tag in fake.tags.values()))
+    posts = [sorted(post['tags']) for post in fake.posts.values()]
+    started = time.perf_counter()
+    for start in range(0, len(posts), 100):
+        resolver.missing_many(posts[start:start + 100])
+    elapsed = time.perf_counter() - started
+    spans = {'check': {'count': len(posts), 'total': elapsed, 'p50': 0.0, 'p95': 0.0, 'max': 0.0}}
+    return len(posts), {'spans': spans}
+
+
+SCENARIOS: dict[str, Callable[[SzuruClient, FakeSzurubooru, argparse.Namespace], Awaitable[tuple[int, dict]]]] = {
+    'direct': bench_direct,
+    'full-scan': bench_full_scan,
+    'delete-unused': bench_delete_unused,
+    'import': bench_import,
+    'check': bench_check,
+}
+
+
+async def run_scenario(name: str, args: argparse.Namespace) -> dict[str, Any]:
+    dataset = Dataset(posts=args.posts, tags=args.tags, tags_per_post=args.tags_per_post,
+                      chain_length=args.chain_length, seed=args.seed)
+    fake = FakeSzurubooru(dataset, Faults(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate))
+    client = SzuruClient(transport=fake.transport())
+    started = time.perf_counter()
+    try:
+        items, timings = await SCENARIOS[name](client, fake, args)
+    finally:
+        await client.aclose()
+    elapsed = time.perf_counter() - started
+    requests = sum(fake.requests.values())
+    return {
+        'scenario': name,
+        'elapsed': round(elapsed, 3),
+        'items': items,
+        'items_per_s': round(items / elapsed, 1) if elapsed else 0.0,
+        'requests': requests,
+        'requests_per_s': round(requests / elapsed, 1) if elapsed else 0.0,
+        'routes': dict(fake.requests.most_common()),
+        'injected_errors': fake.injected_errors,
+        'final_limit': round(client.limiter.limit, 1),
+        'spans': {k: v['total'] for k, v in timings.get('spans', {}).items()},
+    }
+
+
+def _print(result: dict[str, Any]) -> None:
+    print(f"{result['scenario']:<14} {result['elapsed']:>8.2f}s  {result['items']:>8} items "
+          f"({result['items_per_s']:>9.1f}/s)  {result['requests']:>7} requests ({result['requests_per_s']:>8.1f}/s)  "
+          f"errors {result['injected_errors']}  limit {result['final_limit']}")
+    for route, count in result['routes'].items():
+        print(f"    {count:>8}  {route}")
+
+
+def _regressions(results: list[dict[str, Any]], baseline_path: Path, tolerance: float) -> list[str]:
+    baseline = {r['scenario']: r for r in json.loads(baseline_path.read_text())}
+    failures = []
+    for result in results:
+        before = baseline.get(result['scenario'])
+        if before and result['items_per_s'] < before['items_per_s'] * (1 - tolerance):
+            failures.append(f"{result['scenario']}: {result['items_per_s']}/s vs {before['items_per_s']}/s baseline")
+    return failures
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS),
+                        help='scenario to run (repeatable, default: all)')
+    parser.add_argument('--posts', type=int, default=10_000)
+    parser.add_argument('--tags', type=int, default=2_000)
+    parser.add_argument('--tags-per-post', type=int, default=6)
+    parser.add_argument('--chain-length', type=int, default=3)
+    parser.add_argument('--direct-tags', type=int, default=50, help='chain heads passed to the direct run')
+    parser.add_argument('--files', type=int, default=200, help='files produced by the fake gallery-dl')
+    parser.add_argument('--file-size', type=int, default=64 * 1024)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every request')
+    parser.add_argument('--jitter', type=float, default=0.0, help='extra uniform random latency, seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests answered with 503')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', type=Path, help='write results to this file')
+    parser.add_argument('--baseline', type=Path, help='earlier --json output to compare throughput against')
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    parser.add_argument('-v', '--verbose', action='store_true')
+    return parser.parse_args(argv)
+
+
+async def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.ERROR)
+    with tempfile.TemporaryDirectory(prefix='szuru-bench-') as tmp:
+        settings.state_dir = Path(tmp) / 'state'
+        settings.download_dir = Path(tmp) / 'downloads'
+        script = Path(tmp) / 'gallery-dl'
+        script.write_text(FAKE_GALLERY_DL.format(python=sys.executable, files=args.files, size=args.file_size))
+        script.chmod(script.stat().st_mode | stat.S_IEXEC)
+        downloader.GDL_BIN = str(script)
+
+        results = []
+        for name in args.scenario or list(SCENARIOS):
+            result = await run_scenario(name, args)
+            _print(result)
+            results.append(result)
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+    if args.baseline:
+        failures = _regressions(results, args.baseline, args.tolerance)
+        for failure in failures:
+            print(f'REGRESSION {failure}', file=sys.stderr)
+        return 1 if failures else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(asyncio.run(main()))
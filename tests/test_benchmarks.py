@@ -0,0 +1,47 @@
+import os
+
+import pytest
+
+os.environ['SZURU_BASE'] = 'http://test.local'
+os.environ['SZURU_USER'] = 'testuser'
+os.environ['SZURU_TOKEN'] = 'testtoken'
+
+from app.core.config import settings
+from app.services.implications import apply_implications
+from app.services.szuru_client import SzuruClient
+from app.services.tag_cleanup import delete_unused_tags
+from benchmarks.fake_szuru import Dataset, FakeSzurubooru
+
+
+@pytest.fixture
+def fake(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, 'state_dir', tmp_path)
+    return FakeSzurubooru(Dataset(posts=600, tags=120, seed=1))
+
+
+@pytest.mark.asyncio
+async def test_full_scan_against_fake_server_fixes_every_post(fake):
+    expected = fake.posts_missing_implications()
+    assert expected > 0
+    client = SzuruClient(transport=fake.transport())
+
+    events = [event async for event in apply_implications(client, [], full_scan=True)]
+
+    counters = events[-1]['data']
+    assert counters['posts_found'] == 600
+    assert counters['posts_updated'] == expected
+    assert fake.posts_missing_implications() == 0
+    assert fake.requests['PUT api/post/{id}'] == expected
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_delete_unused_against_fake_server(fake):
+    unused = sum(1 for tag in fake.tags.values() if not tag['posts'])
+    client = SzuruClient(transport=fake.transport())
+
+    events = [event async for event in delete_unused_tags(client)]
+
+    assert events[-1]['data'] == {'tags_found': unused, 'tags_deleted': unused}
+    assert all(tag['posts'] for tag in fake.tags.values())
+    await client.aclose()
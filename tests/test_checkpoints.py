@@ -0,0 +1,172 @@
+import os
+
+import httpx
+import pytest
+
+os.environ['SZURU_BASE'] = 'http://test.local'
+os.environ['SZURU_USER'] = 'testuser'
+os.environ['SZURU_TOKEN'] = 'testtoken'
+
+from app.core.config import settings
+from app.services.checkpoints import Checkpoint, Watermark, list_checkpoints
+from app.services.implications import apply_implications
+from app.services.szuru_client import SzuruClient
+from benchmarks.fake_szuru import Dataset, FakeSzurubooru
+
+
+@pytest.fixture
+def fake(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, 'state_dir', tmp_path)
+    monkeypatch.setattr(settings, 'checkpoint_interval', 0)
+    return FakeSzurubooru(Dataset(posts=1000, tags=150, seed=2))
+
+
+async def _interrupt(events, after_posts):
+    run_id = None
+    async for event in events:
+        run_id = run_id or event.get('run_id')
+        if event['type'] == 'progress' and event['current'] >= after_posts:
+            break
+    await events.aclose()
+    return run_id
+
+
+@pytest.mark.asyncio
+async def test_full_scan_resumes_after_checkpoint(fake):
+    expected = fake.posts_missing_implications()
+    client = SzuruClient(transport=fake.transport())
+
+    run_id = await _interrupt(apply_implications(client, [], full_scan=True), after_posts=400)
+    checkpoint = Checkpoint.load(run_id)
+    assert checkpoint.full_scan and not checkpoint.complete
+    assert 0 < checkpoint.last_post_id < 1000
+    assert [c['run_id'] for c in list_checkpoints()] == [run_id]
+
+    fake.requests.clear()
+    events = [e async for e in apply_implications(client, ['ignored'], resume_id=run_id)]
+
+    assert events[-1]['type'] == 'complete'
+    assert events[-1]['run_id'] == run_id
+    assert fake.posts_missing_implications() == 0
+    # the resumed walk only listed posts after the checkpoint
+    assert fake.requests['GET api/posts/'] < 10
+    # writes cancelled mid-flight by the interruption may have landed without being counted
+    assert expected - settings.update_concurrency <= events[-1]['data']['posts_updated'] <= expected
+    # counters saved with the checkpoint stop at its last post, so nothing is counted twice
+    assert events[-1]['data']['posts_found'] == 1000
+    assert Checkpoint.load(run_id).complete
+    assert list_checkpoints() == []
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_failed_listing_and_writes_leave_the_run_resumable(fake):
+    broken = [p['id'] for p in fake.posts.values()
+              if set().union(*(fake.closure(tag) for tag in p['tags'])) - p['tags']][5]
+    assert broken < 300
+    outage = {'listings': 0}
+
+    async def handle(request):
+        if request.method == 'GET' and request.url.path == '/api/posts/':
+            outage['listings'] += 1
+            if outage['listings'] > 4:  # the probe for the highest id, then three pages
+                return httpx.Response(500, json={'description': 'outage'})
+        if request.method == 'PUT' and request.url.path == f'/api/post/{broken}':
+            return httpx.Response(500, json={'description': 'broken'})
+        return await fake.handle(request)
+
+    client = SzuruClient(transport=httpx.MockTransport(handle))
+    events = [e async for e in apply_implications(client, [], full_scan=True)]
+
+    assert events[-1]['resumable'] and 'with 2 errors' in events[-1]['message']
+    checkpoint = Checkpoint.load(events[0]['run_id'])
+    assert not checkpoint.complete
+    # the failed write holds the resume point back, though later posts were written
+    assert checkpoint.last_post_id == broken - 1
+    assert checkpoint.counters['posts_found'] == broken - 1
+    assert Watermark.load() is None
+    await client.aclose()
+
+    client = SzuruClient(transport=fake.transport())
+    events = [e async for e in apply_implications(client, [], resume_id=checkpoint.run_id)]
+
+    assert not events[-1]['resumable']
+    assert events[-1]['data']['posts_found'] == 1000
+    assert fake.posts_missing_implications() == 0
+    assert Checkpoint.load(checkpoint.run_id).complete
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_tag_run_skips_finished_tags_on_resume(fake):
+    heads = [name for name, tag in fake.tags.items() if tag['implications']][::3]
+    checkpoint = Checkpoint(tags=heads, done_tags=heads[:-1])
+    checkpoint.save()
+    client = SzuruClient(transport=fake.transport())
+
+    events = [e async for e in apply_implications(client, [], resume_id=checkpoint.run_id)]
+
+    assert [e['tag'] for e in events if e['type'] == 'progress'] == heads[-1:]
+    assert events[-1]['data']['processed_tags'] == 1
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_unknown_resume_id(fake):
+    client = SzuruClient(transport=fake.transport())
+    events = [e async for e in apply_implications(client, [], resume_id='nope')]
+    assert events == [{'type': 'error', 'message': 'No checkpoint found for run nope'}]
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_incremental_run_only_checks_changes(fake):
+    client = SzuruClient(transport=fake.transport())
+    events = [e async for e in apply_implications(client, [], incremental=True)]
+    assert any('doing a full scan instead' in e.get('message', '') for e in events)
+    assert events[-1]['data']['posts_found'] == 1000
+    watermark = Watermark.load()
+    assert watermark.max_post_id == 1000
+    for post in fake.posts.values():
+        post['last_edit'] = None  # pretend the repairs above happened long ago
+
+    head = next(name for name, tag in fake.tags.items() if tag['implications'])
+    edited = next(p for p in fake.posts.values() if head in p['tags'])
+    fake.edit_post(edited['id'], {head})
+    new_post = fake._add_post({head})
+    plain = next(name for name, tag in fake.tags.items() if not tag['implications'] and len(tag['posts']) > 2)
+    fake.add_implication(plain, 'brand_new')
+    assert fake.posts_missing_implications() > 0
+    fake.requests.clear()
+
+    events = [e async for e in apply_implications(client, [], incremental=True)]
+
+    counters = events[-1]['data']
+    assert events[-1]['message'] == 'APPLICATION COMPLETE (INCREMENTAL)'
+    assert fake.posts_missing_implications() == 0
+    # only the edited post, the new post and posts of tags that now (transitively) imply brand_new
+    affected = set().union(*(t['posts'] for name, t in fake.tags.items() if 'brand_new' in fake.closure(name)))
+    assert counters['posts_found'] == len(affected | {edited['id'], new_post['id']})
+    assert counters['posts_found'] < 500
+    assert Watermark.load().max_post_id == new_post['id']
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_tag_with_a_failed_write_is_not_marked_done(fake):
+    heads = [name for name, tag in fake.tags.items() if tag['implications']][::3][:2]
+    broken = next(p['id'] for p in fake.posts.values()
+                  if heads[0] in p['tags'] and fake.closure(heads[0]) - p['tags'])
+
+    async def handle(request):
+        if request.method == 'PUT' and request.url.path == f'/api/post/{broken}':
+            return httpx.Response(500, json={'description': 'broken'})
+        return await fake.handle(request)
+
+    client = SzuruClient(transport=httpx.MockTransport(handle))
+    events = [e async for e in apply_implications(client, heads)]
+
+    checkpoint = Checkpoint.load(events[0]['run_id'])
+    assert events[-1]['resumable'] and not checkpoint.complete
+    assert checkpoint.done_tags == heads[1:]
+    await client.aclose()
@@ -0,0 +1,52 @@
+import hashlib
+import os
+
+import httpx
+import pytest
+
+os.environ['SZURU_BASE'] = 'http://test.local'
+os.environ['SZURU_USER'] = 'testuser'
+os.environ['SZURU_TOKEN'] = 'testtoken'
+
+from app.services.dedupe import DedupeIndex, file_checksum, sync_index
+from app.services.szuru_client import SzuruClient
+from benchmarks.fake_szuru import Dataset, FakeSzurubooru
+
+
+def test_dedupe_index_roundtrip(tmp_path):
+    index = DedupeIndex(tmp_path / 'dedupe.sqlite3')
+    assert index.lookup('abc') is None
+    index.add('abc', 1)
+    index.add_many([('def', 2), ('abc', 3)])
+    assert index.lookup('abc') == 3
+    assert index.lookup('def') == 2
+    assert len(index) == 2
+    index.close()
+
+    # persists across reopen
+    assert DedupeIndex(tmp_path / 'dedupe.sqlite3').lookup('def') == 2
+
+
+def test_file_checksum_is_sha1(tmp_path):
+    media = tmp_path / 'a.bin'
+    media.write_bytes(b'hello')
+    assert file_checksum(media) == hashlib.sha1(b'hello').hexdigest()
+
+
+@pytest.mark.asyncio
+async def test_sync_index_walks_posts_by_id(tmp_path):
+    fake = FakeSzurubooru(Dataset(posts=250, tags=10, seed=1))
+    urls = []
+
+    async def handler(request):
+        urls.append(str(request.url))
+        return await fake.handle(request)
+
+    client = SzuruClient(transport=httpx.MockTransport(handler))
+    index = DedupeIndex(tmp_path / 'dedupe.sqlite3')
+
+    assert await sync_index(client, index) == 250
+    assert len(index) == 250
+    # id ranges, never deep offsets
+    assert urls and all('offset=0' in url for url in urls)
+    await client.aclose()
@@ -0,0 +1,156 @@
+import json
+import os
+import re
+from unittest.mock import AsyncMock
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+os.environ['SZURU_BASE'] = 'http://test.local'
+os.environ['SZURU_USER'] = 'testuser'
+os.environ['SZURU_TOKEN'] = 'testtoken'
+
+from app.core.config import settings
+from app.services.checkpoints import Checkpoint
+from app.services.implications import apply_implications
+from app.services.szuru_client import SzuruClient, SzuruError
+from app.services.tag_graph import TagGraph
+
+
+def _post(post_id, tags, version=1):
+    return {'id': post_id, 'version': version, 'tags': [{'names': [t]} for t in tags]}
+
+
+@pytest.fixture(autouse=True)
+def _state(tmp_path, monkeypatch):
+    # Runs write checkpoints, summaries and the watermark; keep them out of the real state dir
+    monkeypatch.setattr(settings, 'state_dir', tmp_path)
+
+
+@pytest.fixture
+def mock_client():
+    client = SzuruClient()
+    client.get_tag_graph = AsyncMock(return_value=TagGraph.from_resources([
+        {'names': ['a'], 'implications': [{'names': ['b']}]},
+        {'names': ['b'], 'implications': [{'names': ['c']}]},
+        {'names': ['x'], 'implications': [{'names': ['y']}]},
+    ]))
+    client.update_post_tags = AsyncMock(return_value={})
+    return client
+
+
+def _posts(posts):
+    async def iter_posts(query='', fields=None):
+        for post in posts:
+            yield post
+    return iter_posts
+
+
+async def _run(client, *args, **kwargs):
+    return [event async for event in apply_implications(client, *args, **kwargs)]
+
+
+@pytest.mark.asyncio
+async def test_apply_implications_single_merged_put(mock_client):
+    """A post with several implying tags gets one PUT carrying the full closure"""
+    posts = [_post(1, ['a', 'x']), _post(2, ['a', 'b', 'c'])]
+    mock_client.iter_posts = _posts(posts)
+
+    events = await _run(mock_client, ['a', 'x'])
+
+    mock_client.update_post_tags.assert_called_once_with(1, ['a', 'x', 'b', 'c', 'y'], 1)
+    complete = events[-1]
+    assert complete['type'] == 'complete'
+    assert complete['data']['posts_found'] == 2
+    assert complete['data']['posts_updated'] == 1
+    assert complete['data']['implications_added'] == 3
+
+
+@pytest.mark.asyncio
+async def test_apply_implications_dry_run(mock_client):
+    mock_client.iter_posts = _posts([_post(1, ['a'])])
+
+    events = await _run(mock_client, ['a'], dry_run=True)
+
+    mock_client.update_post_tags.assert_not_called()
+    assert events[-1]['data']['implications_added'] == 2
+    assert any(e.get('message') == 'Post 1: Would add b, c' for e in events)
+
+
+@pytest.mark.asyncio
+async def test_apply_implications_full_scan_walks_posts_once(mock_client):
+    """Full scan walks the corpus in id ranges instead of searching per tag"""
+    page_1 = [_post(i, ['a'] if i == 5 else ['z']) for i in range(1, 101)]
+    page_2 = [_post(101, ['x'])]
+    mock_client._req = AsyncMock(side_effect=[
+        {'results': page_2, 'total': 101},
+        {'results': page_1, 'total': 100},
+        {'results': page_2, 'total': 1},
+        {'results': [], 'total': 0},
+    ])
+
+    events = await _run(mock_client, [], full_scan=True)
+
+    queries = [parse_qs(urlsplit(c.args[1]).query) for c in mock_client._req.call_args_list]
+    assert {q['offset'][0] for q in queries} == {'0'}
+    assert [(q['query'][0], q['limit'][0]) for q in queries] == [
+        ('id:1.. sort:id,desc', '1'),
+        ('id:1..100 sort:id,asc', '100'),
+        ('id:101..200 sort:id,asc', '100'),
+        ('id:102.. sort:id,asc', '100'),
+    ]
+    assert mock_client.update_post_tags.call_count == 2
+    mock_client.update_post_tags.assert_any_call(5, ['a', 'b', 'c'], 1)
+    mock_client.update_post_tags.assert_any_call(101, ['x', 'y'], 1)
+    assert events[-1]['data']['posts_found'] == 101
+
+
+@pytest.mark.asyncio
+async def test_apply_implications_retries_version_conflict(mock_client):
+    """A 409 refetches the post and retries with the recomputed tags and new version"""
+    mock_client.iter_posts = _posts([_post(1, ['a'], version=1)])
+    mock_client.update_post_tags = AsyncMock(side_effect=[
+        SzuruError('PUT', 'api/post/1', 409, 'conflict'),
+        {},
+    ])
+    mock_client.get_post = AsyncMock(return_value=_post(1, ['a', 'b', 'other'], version=2))
+
+    events = await _run(mock_client, ['a'])
+
+    mock_client.get_post.assert_called_once_with(1)
+    mock_client.update_post_tags.assert_called_with(1, ['a', 'b', 'other', 'c'], 2)
+    assert events[-1]['data']['posts_updated'] == 1
+    assert events[-1]['data']['implications_added'] == 1
+
+
+def _serve_posts(posts):
+    """Answer id-range post searches (``id:N..M``, ``id:N..``) from ``posts``"""
+    async def req(method, path, json=None, files=None):
+        params = parse_qs(urlsplit(path).query)
+        low, high = re.match(r'id:(\d+)\.\.(\d*)', params['query'][0]).groups()
+        found = [p for p in posts if int(low) <= p['id'] and (not high or p['id'] <= int(high))]
+        found.sort(key=lambda p: p['id'], reverse='desc' in params['query'][0])
+        return {'results': found[:int(params['limit'][0])], 'total': len(found)}
+    return req
+
+
+@pytest.mark.asyncio
+async def test_failed_write_keeps_the_full_scan_resumable(mock_client, tmp_path):
+    mock_client._req = _serve_posts([_post(5, ['a']), _post(101, ['x'])])
+    mock_client.update_post_tags = AsyncMock(side_effect=[{}, SzuruError('PUT', 'api/post/101', 500, 'boom')])
+
+    events = await _run(mock_client, [], full_scan=True)
+
+    run_id = events[-1]['run_id']
+    assert events[-1]['resumable'] is True
+    saved = json.loads((tmp_path / 'checkpoints' / f'{run_id}.json').read_text())
+    assert saved['complete'] is False and saved['last_post_id'] < 101
+    assert not (tmp_path / 'implications-watermark.json').exists()
+
+    mock_client.update_post_tags = AsyncMock(return_value={})
+    events = await _run(mock_client, [], resume_id=run_id)
+
+    assert events[-1]['resumable'] is False
+    mock_client.update_post_tags.assert_called_once_with(101, ['x', 'y'], 1)
+    assert Checkpoint.load(run_id).complete
+    assert json.loads((tmp_path / 'implications-watermark.json').read_text())['max_post_id'] == 101
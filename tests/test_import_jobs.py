@@ -0,0 +1,55 @@
+import asyncio
+import os
+
+import pytest
+
+os.environ['SZURU_BASE'] = 'http://test.local'
+os.environ['SZURU_USER'] = 'testuser'
+os.environ['SZURU_TOKEN'] = 'testtoken'
+
+from app.core.config import settings
+from app.services import import_jobs
+from app.services.import_jobs import ImportJobQueue, url_domain
+from app.services.szuru_client import SzuruClient
+
+
+def test_url_domain():
+    assert url_domain('https://www.Example.com/a/b') == 'example.com'
+    assert url_domain('https://twitter.com/user/status/1') == 'twitter.com'
+
+
+@pytest.mark.asyncio
+async def test_queue_respects_domain_cap_and_resumes(tmp_path, monkeypatch):
+    started = []
+    release = asyncio.Event()
+
+    async def fake_import(client, url, *, safety, attach_source, dest, result):
+        started.append(url)
+        await release.wait()
+        result.downloaded = result.uploaded = 1
+        return result
+
+    monkeypatch.setattr(import_jobs, 'import_url', fake_import)
+    monkeypatch.setattr(settings, 'download_dir', tmp_path / 'downloads')
+    queue = ImportJobQueue(tmp_path / 'jobs.sqlite3', SzuruClient())
+    jobs = queue.enqueue(['https://a.com/1', 'https://a.com/2', 'https://b.com/1'])
+    await queue.start()
+    await asyncio.sleep(0.05)
+
+    # one job per domain by default
+    assert sorted(started) == ['https://a.com/1', 'https://b.com/1']
+    assert queue.get(jobs[1]['id'])['status'] == 'queued'
+
+    # a restart requeues the interrupted jobs
+    await queue.stop()
+    assert queue.get(jobs[0]['id'])['status'] == 'running'
+    resumed = ImportJobQueue(tmp_path / 'jobs.sqlite3', SzuruClient())
+    release.set()
+    await resumed.start()
+    for _ in range(50):
+        await asyncio.sleep(0.01)
+        if resumed.counts().get('done') == 3:
+            break
+    await resumed.stop()
+    assert resumed.counts() == {'done': 3}
+    assert resumed.get(jobs[2]['id'])['uploaded'] == 1
@@ -0,0 +1,105 @@
+import hashlib
+import os
+import stat
+from unittest.mock import AsyncMock
+
+import pytest
+
+os.environ['SZURU_BASE'] = 'http://test.local'
+os.environ['SZURU_USER'] = 'testuser'
+os.environ['SZURU_TOKEN'] = 'testtoken'
+
+from app.core.config import settings
+from app.services import downloader, importer
+from app.services.dedupe import DedupeIndex
+from app.services.szuru_client import SzuruClient
+
+FAKE_GALLERY_DL = """#!/bin/sh
+# mimic gallery-dl in pipe output mode: write file + sidecar, print the path
+while [ "$1" != "-D" ]; do shift; done
+dest="$2"
+for i in 1 2 3; do
+    printf 'content %s' "$i" > "$dest/file$i.jpg"
+    echo '{"tags": ["creator:someone", "tag '$i'"]}' > "$dest/file$i.jpg.json"
+    echo "$dest/file$i.jpg"
+done
+echo "# $dest/skipped.jpg"
+"""
+
+
+@pytest.fixture
+def fake_gallery_dl(tmp_path, monkeypatch):
+    script = tmp_path / 'gallery-dl'
+    script.write_text(FAKE_GALLERY_DL)
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setattr(downloader, 'GDL_BIN', str(script))
+    # Imports record run timings; keep them out of the real state dir
+    monkeypatch.setattr(settings, 'state_dir', tmp_path)
+    index = DedupeIndex(tmp_path / 'dedupe.sqlite3')
+    monkeypatch.setattr(importer, 'get_dedupe_index', lambda: index)
+    return index
+
+
+@pytest.fixture
+def mock_client():
+    client = SzuruClient()
+    client.ensure_category = AsyncMock()
+    client.ensure_tag = AsyncMock()
+    client.upload_post = AsyncMock(return_value={'id': 10})
+    return client
+
+
+@pytest.mark.asyncio
+async def test_import_url_uploads_streamed_files(fake_gallery_dl, mock_client, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, 'download_dir', tmp_path)
+    dest = downloader.new_work_dir('job')
+
+    result = await importer.import_url(mock_client, 'https://example.com/gallery', dest=dest)
+
+    assert (result.downloaded, result.uploaded, result.skipped, result.errors) == (3, 3, 0, 0)
+    uploaded = sorted(c.args[0] for c in mock_client.upload_post.call_args_list)
+    assert uploaded == [str(dest / f'file{i}.jpg') for i in (1, 2, 3)]
+    tags = {c.args[0]: c.args[1] for c in mock_client.upload_post.call_args_list}
+    assert tags[str(dest / 'file1.jpg')] == ['someone', 'tag_1']
+    # processed media lives outside the work dir, so cleaning that up keeps it
+    downloader.cleanup_work_dirs(max_age=-1)
+    assert not dest.exists()
+    assert sorted(p.name for p in (tmp_path / 'processed').iterdir()) == [
+        'file1.jpg', 'file1.jpg.json', 'file2.jpg', 'file2.jpg.json', 'file3.jpg', 'file3.jpg.json'
+    ]
+    assert len(fake_gallery_dl) == 3
+
+
+def test_cleanup_work_dirs(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, 'download_dir', tmp_path)
+    old = downloader.new_work_dir('old')
+    fresh = downloader.new_work_dir('fresh')
+    os.utime(old, (0, 0))
+
+    assert downloader.cleanup_work_dirs(max_age=3600) == [old]
+    assert not old.exists() and fresh.exists()
+
+
+@pytest.mark.asyncio
+async def test_import_url_uses_private_work_dir(fake_gallery_dl, mock_client, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, 'download_dir', tmp_path / 'downloads')
+    (tmp_path / 'downloads').mkdir()
+    (tmp_path / 'downloads' / 'stray.jpg').write_bytes(b'someone else')
+
+    result = await importer.import_url(mock_client, 'https://example.com/gallery')
+
+    assert result.uploaded == 3
+    uploaded = {c.args[0] for c in mock_client.upload_post.call_args_list}
+    assert all('/downloads/jobs/' in path for path in uploaded)
+
+
+@pytest.mark.asyncio
+async def test_import_url_skips_known_content(fake_gallery_dl, mock_client, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, 'download_dir', tmp_path)
+    fake_gallery_dl.add(hashlib.sha1(b'content 2').hexdigest(), 99)
+
+    result = await importer.import_url(mock_client, 'https://example.com/gallery', dest=tmp_path / 'dl')
+
+    assert (result.uploaded, result.skipped) == (2, 1)
+    assert 'Skipped file2.jpg: already uploaded as post 99' in result.details
+    assert sorted(p.name for p in (tmp_path / 'processed').glob('*.jpg')) == ['file1.jpg', 'file2.jpg', 'file3.jpg']
@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+from app.services.limiter import AdaptiveLimiter
+
+
+async def _run(limiter, n, overloaded=False):
+    async def request():
+        async with limiter.slot() as slot:
+            await asyncio.sleep(0.001)
+            slot.overloaded = overloaded
+    await asyncio.gather(*(request() for _ in range(n)))
+
+
+@pytest.mark.asyncio
+async def test_limiter_grows_while_healthy_and_backs_off_on_overload():
+    limiter = AdaptiveLimiter(initial=2, min_limit=1, max_limit=8)
+
+    await _run(limiter, 200)
+    grown = limiter.limit
+    assert grown > 2
+
+    await _run(limiter, 20, overloaded=True)
+    assert limiter.limit < grown
+    assert limiter.limit >= 1
+    assert limiter.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_limiter_caps_in_flight():
+    limiter = AdaptiveLimiter(initial=3, min_limit=3, max_limit=3)
+    peak = 0
+
+    async def request():
+        nonlocal peak
+        async with limiter.slot():
+            peak = max(peak, limiter.in_flight)
+            await asyncio.sleep(0.005)
+
+    await asyncio.gather(*(request() for _ in range(12)))
+    assert peak == 3
+
+
+@pytest.mark.asyncio
+async def test_limiter_grows_with_mixed_route_latencies():
+    # Fast and slow routes whose latency doesn't depend on load mustn't read as overload
+    limiter = AdaptiveLimiter(initial=4, max_limit=32)
+
+    async def worker(n):
+        for i in range(150):
+            slow = (n + i) % 4 == 0
+            async with limiter.slot('POST api/posts/' if slow else 'GET api/posts/'):
+                await asyncio.sleep(0.02 if slow else 0.002)
+
+    await asyncio.gather(*(worker(n) for n in range(40)))
+    assert limiter.limit > 16
+
+
+@pytest.mark.asyncio
+async def test_limiter_backs_off_when_latency_follows_load():
+    limiter = AdaptiveLimiter(initial=4, max_limit=32)
+
+    async def worker():
+        for _ in range(150):
+            async with limiter.slot('GET api/posts/'):
+                await asyncio.sleep(0.001 * max(1, limiter.in_flight - 8))
+
+    await asyncio.gather(*(worker() for _ in range(40)))
+    assert limiter.limit < 16
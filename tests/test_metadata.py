@@ -0,0 +1,49 @@
+import json
+
+from app.services.metadata import read_metadata
+
+
+def _write(tmp_path, name, data, suffix='.json'):
+    media = tmp_path / name
+    media.write_bytes(b'')
+    (tmp_path / (name + suffix)).write_text(json.dumps(data))
+    return media
+
+
+def test_read_metadata_generic_sidecars(tmp_path):
+    media = _write(tmp_path, 'a.jpg', {'tags': ['Creator:John Doe', 'misc tag'], 'webpage_url': 'https://example.com/1'})
+    (tmp_path / 'a.jpg.info.json').write_text(json.dumps({'keywords': ['other'], 'url': 'https://example.com/2'}))
+
+    meta = read_metadata(media)
+
+    assert meta.raw_tags() == ['creator:john_doe', 'misc_tag', 'other']
+    assert meta.source == 'https://example.com/1'
+    assert meta.safety is None
+
+
+def test_read_metadata_extractor_mappings(tmp_path):
+    danbooru = read_metadata(_write(tmp_path, 'd.jpg', {
+        'category': 'danbooru',
+        'tag_string_artist': 'some_artist',
+        'tag_string_character': 'alice bob',
+        'tag_string_general': '1girl solo',
+        'rating': 'e',
+    }))
+    assert danbooru.tags == {
+        'creator': {'some_artist'}, 'character': {'alice', 'bob'}, 'default': {'1girl', 'solo'}
+    }
+    assert danbooru.safety == 'unsafe'
+
+    e621 = read_metadata(_write(tmp_path, 'e.png', {
+        'category': 'e621',
+        'tags': {'artist': ['painter'], 'species': ['fox'], 'invalid': ['x']},
+        'rating': 'q',
+    }))
+    assert e621.raw_tags() == ['creator:painter', 'fox']
+    assert e621.safety == 'sketchy'
+
+    pixiv = read_metadata(_write(tmp_path, 'p.png', {
+        'category': 'pixiv', 'tags': ['landscape'], 'user': {'account': 'someone'}, 'x_restrict': 0
+    }))
+    assert pixiv.raw_tags() == ['creator:someone', 'landscape']
+    assert pixiv.safety == 'safe'
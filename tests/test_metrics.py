@@ -0,0 +1,10 @@
+from app.core.metrics import route_label
+
+
+def test_route_label_collapses_ids_and_names():
+    base = 'http://test.local'
+    assert route_label(f'{base}/api/post/123', base) == 'api/post/{id}'
+    assert route_label(f'{base}/api/tag/some_tag', base) == 'api/tag/{name}'
+    assert route_label(f'{base}/api/tag-category/meta', base) == 'api/tag-category/{name}'
+    assert route_label(f'{base}/api/posts/?limit=100&offset=0', base) == 'api/posts/'
+    assert route_label(f'{base}/api/uploads', base) == 'api/uploads'
@@ -0,0 +1,60 @@
+import asyncio
+import os
+from unittest.mock import AsyncMock
+
+import httpx
+import pytest
+
+os.environ['SZURU_BASE'] = 'http://test.local'
+os.environ['SZURU_USER'] = 'testuser'
+os.environ['SZURU_TOKEN'] = 'testtoken'
+
+from app.core.config import settings
+from app.services import profiling
+from app.services.implications import apply_implications
+from app.services.szuru_client import SzuruClient
+from app.services.tag_graph import TagGraph
+
+
+@pytest.mark.asyncio
+async def test_run_timer_collects_spans_from_child_tasks(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, 'state_dir', tmp_path)
+
+    @profiling.timed('work')
+    async def work():
+        await asyncio.sleep(0.001)
+
+    await work()  # outside a run: not recorded anywhere
+    with profiling.run_timer('test', profile=True) as timer:
+        await asyncio.gather(*(asyncio.create_task(work()) for _ in range(5)))
+        profiling.record('gallery_dl', 2.0)
+
+    summary = profiling.get_summary(timer.run_id)
+    assert summary['spans']['work']['count'] == 5
+    assert summary['spans']['gallery_dl'] == {'count': 1, 'total': 2.0, 'p50': 2.0, 'p95': 2.0, 'max': 2.0}
+    assert profiling.current_timer() is None
+    assert profiling.profile_path(timer.run_id) is not None
+    assert (tmp_path / 'runs' / f'{timer.run_id}.json').is_file()
+
+
+@pytest.mark.asyncio
+async def test_apply_implications_reports_timings(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, 'state_dir', tmp_path)
+
+    client = SzuruClient(transport=httpx.MockTransport(lambda request: httpx.Response(200, json={})))
+    client.get_tag_graph = AsyncMock(return_value=TagGraph.from_resources([
+        {'names': ['a'], 'implications': [{'names': ['b']}]},
+    ]))
+
+    async def iter_posts(query='', fields=None):
+        yield {'id': 1, 'version': 1, 'tags': [{'names': ['a']}]}
+    client.iter_posts = iter_posts
+
+    events = [event async for event in apply_implications(client, ['a'])]
+
+    complete = events[-1]
+    assert complete['type'] == 'complete'
+    spans = complete['timings']['spans']
+    assert spans['update_post_tags']['count'] == 1
+    assert 'closure' in spans
+    assert profiling.get_summary(complete['run_id'])['kind'] == 'apply_implications'
@@ -0,0 +1,83 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+os.environ['SZURU_BASE'] = 'http://test.local'
+os.environ['SZURU_USER'] = 'testuser'
+os.environ['SZURU_TOKEN'] = 'testtoken'
+
+from app.core.config import settings
+from app.services.reports import ReportSummary, ReportWriter, report_path, sample_details
+from app.services.streaming import coalesce
+
+
+async def _events(n, delay=0.0):
+    yield {'type': 'status', 'message': 'start'}
+    for i in range(n):
+        if delay:
+            await asyncio.sleep(delay)
+        yield {'type': 'progress', 'current': i + 1, 'total': n}
+        yield {'type': 'success', 'post_id': i, 'message': f'Post {i}: Added x'}
+    yield {'type': 'error', 'message': 'one failure'}
+    yield {'type': 'complete', 'data': {'posts_updated': n}, 'message': 'done'}
+
+
+@pytest.mark.asyncio
+async def test_coalesce_samples_per_item_lines_and_logs_everything(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, 'state_dir', tmp_path)
+    with ReportWriter() as report:
+        batches = [b async for b in coalesce(_events(5000), report, interval=10, sample=20)]
+
+    assert len(batches) == 1
+    batch = batches[0]
+    assert [e['type'] for e in batch['events']].count('success') == 20
+    assert batch['events'][0]['message'] == 'start'
+    assert batch['events'][-2:] == [{'type': 'error', 'message': 'one failure'},
+                                    {'type': 'complete', 'data': {'posts_updated': 5000}, 'message': 'done'}]
+    assert batch['omitted'] == 4980
+    assert batch['progress']['current'] == 5000
+    assert batch['totals'] == {'status': 1, 'progress': 5000, 'success': 5000, 'error': 1, 'complete': 1}
+
+    lines = report_path(report.id).read_text().splitlines()
+    assert len(lines) == 10003
+    assert json.loads(lines[1])['type'] == 'progress'
+
+
+@pytest.mark.asyncio
+async def test_coalesce_flushes_on_time_while_the_run_is_waiting(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, 'state_dir', tmp_path)
+    with ReportWriter() as report:
+        batches = [b async for b in coalesce(_events(4, delay=0.05), report, interval=0.02)]
+
+    assert len(batches) >= 4
+    assert batches[-1]['totals']['success'] == 4
+
+
+@pytest.mark.asyncio
+async def test_coalesce_reports_errors(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, 'state_dir', tmp_path)
+
+    async def failing():
+        yield {'type': 'status', 'message': 'start'}
+        raise RuntimeError('boom')
+
+    with ReportWriter() as report:
+        batches = [b async for b in coalesce(failing(), report)]
+
+    events = [e for b in batches for e in b['events']]
+    assert events[-1] == {'type': 'error', 'message': 'Unexpected error: boom'}
+
+
+@pytest.mark.asyncio
+async def test_sample_details_keeps_a_bounded_sample():
+    summary = ReportSummary('r1')
+
+    passed = [e async for e in sample_details(_events(1000), summary, sample=10)]
+
+    assert len(passed) == 2003
+    assert summary.complete['data'] == {'posts_updated': 1000}
+    assert summary.details[0] == 'start'
+    assert len(summary.details) == 10
+    assert summary.omitted == 1000 + 1 - 9  # successes and the error, minus those sampled
@@ -1,6 +1,8 @@
+import asyncio
 import os
 from unittest.mock import AsyncMock
 
+import httpx
 import pytest
 
 # Set environment variables before importing the module
@@ -8,7 +10,7 @@ os.environ['SZURU_BASE'] = 'http://test.local'
 os.environ['SZURU_USER'] = 'testuser'
 os.environ['SZURU_TOKEN'] = 'testtoken'
 
-from app.services.szuru_client import SzuruClient
+from app.services.szuru_client import SzuruClient, SzuruError
 
 
 @pytest.fixture
@@ -80,3 +82,172 @@ async def test_delete_tag(mock_client):
     
     mock_client._req.assert_called_once_with('DELETE', 'api/tag/test_tag', json={'version': 5})
     assert result == {'success': True}
+
+
+@pytest.mark.asyncio
+async def test_iter_pages_prefetches_using_total(mock_client):
+    """Once total is known, the remaining pages are requested by offset"""
+    pages = {
+        0: [{'id': i} for i in range(100)],
+        100: [{'id': i} for i in range(100, 200)],
+        200: [{'id': 200}],
+    }
+
+    async def fake_req(method, url):
+        offset = int(url.split('offset=')[1].split('&')[0])
+        return {'results': pages[offset], 'total': 201}
+
+    mock_client._req.side_effect = fake_req
+
+    posts = [post async for post in mock_client.iter_posts('tag:foo')]
+
+    assert [p['id'] for p in posts] == list(range(201))
+    assert mock_client._req.call_count == 3
+
+
+@pytest.mark.asyncio
+async def test_iter_posts_by_id_survives_deletes_mid_walk():
+    """Id-range pages don't shift when posts are deleted, and new posts are picked up at the end"""
+    from benchmarks.fake_szuru import Dataset, FakeSzurubooru
+
+    fake = FakeSzurubooru(Dataset(posts=350, tags=40, seed=4))
+    client = SzuruClient(transport=fake.transport())
+    ids = []
+    async for page in client.iter_posts_by_id(after=20, fields=('id',)):
+        ids += [p['id'] for p in page.results]
+        if len(ids) == 100:
+            for post_id in range(1, 150, 2):  # delete posts behind and ahead of the walk
+                fake.posts.pop(post_id, None)
+            fake._add_post({'t000001'})
+
+    assert ids == sorted(set(ids))
+    assert set(ids) >= {i for i in fake.posts if i > 20}
+    assert ids[-1] == 351
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_get_unused_tags_filters_server_side(mock_client):
+    """get_unused_tags pushes the usages filter and a field projection to the server"""
+    mock_client._req.return_value = {'results': []}
+
+    await mock_client.get_unused_tags()
+
+    url = mock_client._req.call_args.args[1]
+    assert 'query=usages%3A0' in url
+    assert 'fields=names%2Cversion%2Cusages' in url
+
+
+@pytest.mark.asyncio
+async def test_upload_post_reuses_content_token(mock_client, tmp_path, monkeypatch):
+    """A failed post creation is retried with the token after a backoff, without re-uploading the file"""
+    delays = []
+    monkeypatch.setattr(mock_client, '_backoff', lambda attempt: delays.append(attempt) or 0)
+    media = tmp_path / 'image.png'
+    media.write_bytes(b'not really a png')
+    mock_client._req.side_effect = [
+        {'token': 'abc123'},
+        SzuruError('POST', 'api/posts/', 503, 'busy'),
+        {'id': 7},
+    ]
+
+    result = await mock_client.upload_post(str(media), ['tag'], source='https://example.com/1')
+
+    assert result == {'id': 7}
+    assert delays == [0]
+    assert mock_client._req.call_count == 3
+    assert mock_client._req.call_args_list[0].args[:2] == ('POST', 'api/uploads')
+    assert mock_client._req.call_args.kwargs['json'] == {
+        'tags': ['tag'], 'safety': 'safe', 'contentToken': 'abc123', 'source': 'https://example.com/1'
+    }
+
+
+@pytest.mark.asyncio
+async def test_ensure_tag_caches_and_coalesces(mock_client):
+    """Concurrent ensure_tag calls share one lookup and later calls hit the cache"""
+    async def fake_req(method, url, json=None):
+        await asyncio.sleep(0.01)
+        if method == 'GET':
+            raise SzuruError(method, url, 404, 'TagNotFoundError')
+        return {}
+
+    mock_client._req.side_effect = fake_req
+
+    results = await asyncio.gather(*(mock_client.ensure_tag('new_tag', 'default') for _ in range(5)))
+    assert results == ['created'] * 5
+    assert [c.args[0] for c in mock_client._req.call_args_list] == ['GET', 'POST']
+
+    assert await mock_client.ensure_tag('new_tag', 'default') == 'exists'
+    assert mock_client._req.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_req_retries_transient_errors_for_idempotent_calls(monkeypatch):
+    """GETs are retried on 503 with backoff; writes are not"""
+    calls = []
+
+    def handler(request):
+        calls.append(request.method)
+        if len(calls) < 3:
+            return httpx.Response(503, text='busy')
+        return httpx.Response(200, json={'ok': True})
+
+    monkeypatch.setattr(SzuruClient, '_backoff', staticmethod(lambda attempt: 0))
+    client = SzuruClient(transport=httpx.MockTransport(handler))
+
+    assert await client._req('GET', 'api/info') == {'ok': True}
+    assert calls == ['GET'] * 3
+    assert client._request_headers()['Authorization'].startswith('Token ')
+
+    calls.clear()
+    with pytest.raises(SzuruError) as exc:
+        await client._req('PUT', 'api/post/1', json={})
+    assert exc.value.status_code == 503
+    assert calls == ['PUT']
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_request_latency_excludes_limiter_queueing():
+    """Requests waiting for a local slot don't count that wait as server latency"""
+    from prometheus_client import REGISTRY
+
+    from app.services.limiter import AdaptiveLimiter
+
+    async def handler(request):
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json={})
+
+    client = SzuruClient(transport=httpx.MockTransport(handler))
+    client.limiter = AdaptiveLimiter(initial=1, max_limit=1)
+    labels = {'method': 'GET', 'route': 'api/info', 'status': '200'}
+    fast = {**labels, 'le': '0.1'}
+    before = REGISTRY.get_sample_value('szuru_request_duration_seconds_bucket', fast) or 0
+
+    await asyncio.gather(*(client._req('GET', 'api/info') for _ in range(3)))
+
+    # queued behind one another they finish at ~50, ~100 and ~150 ms, but each took ~50 ms
+    assert REGISTRY.get_sample_value('szuru_request_duration_seconds_bucket', fast) - before == 3
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_upload_file_streams_a_multipart_body(tmp_path):
+    media = tmp_path / 'image.png'
+    media.write_bytes(b'x' * 200_000)
+    seen = {}
+
+    async def handler(request):
+        seen['body'] = await request.aread()
+        seen['headers'] = request.headers
+        return httpx.Response(200, json={'token': 'abc123'})
+
+    client = SzuruClient(transport=httpx.MockTransport(handler))
+    assert await client.upload_file(str(media)) == 'abc123'
+
+    boundary = seen['headers']['content-type'].split('boundary=')[1]
+    assert int(seen['headers']['content-length']) == len(seen['body'])
+    assert seen['body'].startswith(f'--{boundary}\r\n'.encode())
+    assert b'name="content"; filename="image.png"' in seen['body']
+    assert seen['body'].endswith(b'x' * 200_000 + f'\r\n--{boundary}--\r\n'.encode())
+    await client.aclose()
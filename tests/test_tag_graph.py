@@ -0,0 +1,69 @@
+from app.services.tag_graph import ImplicationResolver, TagGraph
+
+
+def _tag(names, implications=(), usages=0, category='default'):
+    return {
+        'names': list(names),
+        'category': category,
+        'usages': usages,
+        'version': 1,
+        'implications': [{'names': [imp]} for imp in implications],
+    }
+
+
+def test_tag_graph_from_resources():
+    graph = TagGraph.from_resources([
+        _tag(['Pondering My Orb', 'orb_pondering'], implications=['Orb'], usages=3),
+        _tag(['orb'], usages=7),
+    ])
+    assert len(graph) == 2
+    assert graph.tags_with_implications() == ['pondering_my_orb']
+    assert graph.implications('pondering_my_orb') == ['orb']
+    # aliases resolve to the primary name
+    assert graph.implications('orb_pondering') == ['orb']
+    assert graph.get('orb').usages == 7
+    assert graph.implications('unknown') == []
+
+
+def test_resolver_transitive_closure():
+    graph = TagGraph.from_resources([
+        _tag(['a'], implications=['b']),
+        _tag(['b'], implications=['c']),
+        _tag(['c']),
+        _tag(['x'], implications=['y']),
+    ])
+    resolver = ImplicationResolver(graph)
+    assert resolver.closure('a') == {'b', 'c'}
+    assert resolver.missing(['a', 'x']) == ['b', 'c', 'y']
+    assert resolver.missing(['a', 'x'], roots=['x']) == ['y']
+    assert resolver.missing(['a', 'b', 'c']) == []
+    assert resolver.cycles == []
+
+
+def test_resolver_cycle_detection():
+    graph = TagGraph.from_resources([
+        _tag(['a'], implications=['b']),
+        _tag(['b'], implications=['c']),
+        _tag(['c'], implications=['a', 'd']),
+        _tag(['d']),
+    ])
+    resolver = ImplicationResolver(graph)
+    assert resolver.closure('a') == {'b', 'c', 'd'}
+    assert resolver.closure('c') == {'a', 'b', 'd'}
+    assert resolver.cycles == [['a', 'b', 'c']]
+
+
+def test_resolver_missing_many_matches_per_post_checks():
+    graph = TagGraph.from_resources([
+        _tag(['a', 'alias_a'], implications=['b']),
+        _tag(['b'], implications=['c']),
+        _tag(['c']),
+        _tag(['x'], implications=['y']),
+        _tag(['unrelated']),
+    ])
+    resolver = ImplicationResolver(graph)
+    posts = [['Alias A'], ['b', 'unrelated'], ['a', 'c', 'x', 'y'], [], ['not_a_tag', 'x']]
+    assert resolver.missing_many(posts) == [['b', 'c'], ['c'], ['b'], [], ['y']]
+    assert resolver.missing_many(posts, roots=['alias_a']) == [['b', 'c'], [], ['b'], [], []]
+    assert resolver.missing_many(posts) == [resolver.missing(tags) for tags in posts]
+    assert resolver.digests().keys() == {'a', 'b', 'x'}
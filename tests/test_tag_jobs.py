@@ -0,0 +1,161 @@
+import asyncio
+import os
+
+import pytest
+
+os.environ['SZURU_BASE'] = 'http://test.local'
+os.environ['SZURU_USER'] = 'testuser'
+os.environ['SZURU_TOKEN'] = 'testtoken'
+
+from app.core.config import settings
+from app.services import tag_jobs
+from app.services.checkpoints import Checkpoint
+from app.services.implications import apply_implications
+from app.services.profiling import run_timer
+from app.services.szuru_client import SzuruClient
+from app.services.tag_jobs import JobConflict, TagJobManager
+from benchmarks.fake_szuru import Dataset, FakeSzurubooru, Faults
+
+
+@pytest.fixture(autouse=True)
+def _state(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, 'state_dir', tmp_path)
+    monkeypatch.setattr(settings, 'stream_batch_interval', 0.01)
+
+
+async def _events(n, release: asyncio.Event | None = None):
+    yield {'type': 'status', 'message': 'start', 'run_id': 'r1'}
+    for i in range(n):
+        if release is not None and i == n // 2:
+            await release.wait()
+        await asyncio.sleep(0)
+        yield {'type': 'success', 'message': f'Post {i}'}
+    yield {'type': 'complete', 'data': {'posts_updated': n}, 'message': 'done'}
+
+
+async def _collect(job):
+    items = []
+    async for item in job.subscribe():
+        items.append(item)
+    return items
+
+
+@pytest.mark.asyncio
+async def test_late_subscribers_replay_the_run():
+    manager = TagJobManager()
+    release = asyncio.Event()
+    job = manager.start('apply_implications', {}, lambda: _events(10, release))
+    early = asyncio.create_task(_collect(job))
+    await asyncio.sleep(0.05)
+    release.set()
+    await job.task
+
+    for items in (await early, await _collect(job)):
+        assert items[-1] == {'type': 'job', 'job_id': job.id, 'status': 'done', 'message': 'apply_implications finished'}
+        assert sum(b['counts'].get('success', 0) for b in items if b['type'] == 'batch') == 10
+    assert job.run_id == 'r1'
+    assert job.result == {'posts_updated': 10}
+    assert job.report_id and job.to_dict()['totals']['success'] == 10
+
+
+@pytest.mark.asyncio
+async def test_one_active_job_per_kind():
+    manager = TagJobManager()
+    release = asyncio.Event()
+    job = manager.start('delete_unused_tags', {}, lambda: _events(4, release))
+    with pytest.raises(JobConflict) as exc:
+        manager.start('delete_unused_tags', {}, lambda: _events(4))
+    assert exc.value.job is job
+    other = manager.start('apply_implications', {}, lambda: _events(4))
+
+    release.set()
+    await asyncio.gather(job.task, other.task)
+    again = manager.start('delete_unused_tags', {}, lambda: _events(4))
+    await again.task
+    assert [j.status for j in manager.list_jobs()] == ['done', 'done', 'done']
+    assert manager.list_jobs(active=True) == []
+
+
+@pytest.mark.asyncio
+async def test_pause_holds_requests_and_cancel_stops_the_job():
+    fake = FakeSzurubooru(Dataset(posts=3000, tags=80, seed=3), Faults(latency=0.01))
+    client = SzuruClient(transport=fake.transport())
+    manager = TagJobManager()
+    job = manager.start('apply_implications', {}, lambda: apply_implications(client, [], full_scan=True))
+
+    while fake.requests['GET api/posts/'] == 0:
+        await asyncio.sleep(0.01)
+    job.pause()
+    await asyncio.sleep(0.05)  # requests already in flight finish
+    held = sum(fake.requests.values())
+    await asyncio.sleep(0.1)
+    assert sum(fake.requests.values()) == held
+    assert job.status == 'paused'
+
+    job.resume()
+    await asyncio.sleep(0.02)
+    assert sum(fake.requests.values()) > held
+
+    await job.cancel()
+    assert job.status == 'cancelled' and job.finished is not None
+    assert job.task.done()
+    assert [b['status'] for b in job.history if b['type'] == 'job'] == ['paused', 'running', 'cancelled']
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_slow_subscribers_are_dropped(monkeypatch):
+    monkeypatch.setattr(tag_jobs, 'SUBSCRIBER_QUEUE_SIZE', 1)
+    manager = TagJobManager()
+    release = asyncio.Event()
+    job = manager.start('apply_implications', {}, lambda: _events(10, release))
+    await asyncio.sleep(0.05)
+    slow = job.subscribe()
+    await slow.__anext__()  # subscribed, then stops reading
+
+    release.set()
+    await job.task
+    rest = [item async for item in slow]
+    assert rest[-1]['type'] == 'lagged'
+    assert not any(item['type'] == 'job' for item in rest)
+    assert not job._subscribers
+    # Reconnecting replays the run
+    assert (await _collect(job))[-1]['status'] == 'done'
+
+
+@pytest.mark.asyncio
+async def test_run_id_is_known_before_the_first_flush(monkeypatch):
+    monkeypatch.setattr(settings, 'stream_batch_interval', 10)
+    fake = FakeSzurubooru(Dataset(posts=10, tags=5, seed=3), Faults(latency=0.5))
+    client = SzuruClient(transport=fake.transport())
+    manager = TagJobManager()
+    job = manager.start('apply_implications', {}, lambda: apply_implications(client, [], full_scan=True))
+    await asyncio.sleep(0.05)  # still loading the tag graph
+    await job.cancel()
+
+    assert job.status == 'cancelled' and not any(b['type'] == 'batch' for b in job.history)
+    assert job.run_id is not None
+    assert Checkpoint.load(job.run_id) is not None
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_framing_events_is_timed_against_the_run():
+    manager = TagJobManager()
+    release = asyncio.Event()
+    timers = []
+
+    async def timed():
+        with run_timer('apply_implications') as timer:
+            timers.append(timer)
+            async for event in _events(4, release):
+                yield event
+
+    job = manager.start('apply_implications', {}, timed)
+    await asyncio.sleep(0.05)
+    chunk = job.frame(job.history[0])
+    release.set()
+    await job.task
+
+    assert chunk.startswith('data: {"type": "batch"') and chunk.endswith('\n\n')
+    assert timers[0].summary()['spans']['serialize_events']['count'] == 1
@@ -0,0 +1,29 @@
+import asyncio
+
+import pytest
+
+from app.services.workers import WorkerPool
+
+
+@pytest.mark.asyncio
+async def test_worker_pool_bounds_concurrency():
+    in_flight = 0
+    peak = 0
+
+    async def job(i):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return i
+
+    pool = WorkerPool(3)
+    results = []
+    for i in range(10):
+        await pool.submit(job(i))
+        results.extend(pool.completed())
+    results.extend([r async for r in pool.drain()])
+
+    assert sorted(results) == list(range(10))
+    assert peak == 3